@@ -0,0 +1,64 @@
+"""
+Calendar index of a daily climate record
+
+Dates are carried around the model as "YYYY-MM-DD" strings. The index converts them to
+datetime64 once and keeps the year of each day, the year boundaries and the month of each day,
+so per year groupings and reductions are vectorized numpy operations rather than strptime and
+itertools.groupby on every call. calendar_index() keeps the indices of recently seen date
+arrays, so helpers called every year of a run share one index.
+"""
+import collections
+import numpy as np
+
+
+class CalendarIndex():
+
+	def __init__(self, dates):
+		self.days = np.asarray(dates).astype('datetime64[D]')
+		self.years = self.days.astype('datetime64[Y]').astype(int) + 1970
+		self.months = self.days.astype('datetime64[M]').astype(int) % 12 + 1
+
+		# boundaries of consecutive runs of days in the same year
+		self.year_starts = np.concatenate(([0], np.flatnonzero(np.diff(self.years)) + 1)) if len(self.years) > 0 else np.array([], dtype=int)
+		self.year_ends = np.append(self.year_starts[1:], len(self.years))
+		self.year_list = self.years[self.year_starts].tolist()
+
+	def __len__(self):
+		return len(self.days)
+
+	# [{"start": i, "end": j}] of each year, as returned by get_year_indices
+	def year_indices(self):
+		return [{"start": start, "end": end} for start, end in zip(self.year_starts.tolist(), self.year_ends.tolist())]
+
+	# ufunc.reduceat of data over each year, e.g. np.add for annual totals
+	def reduce_by_year(self, data, ufunc=np.add):
+		data = np.asarray(data)
+		assert len(data) == len(self)
+		return ufunc.reduceat(data, self.year_starts, axis=0)
+
+	# f applied to the days of each year, for reductions without a ufunc (np.std, np.median, ...)
+	def apply_by_year(self, data, f):
+		data = np.asarray(data)
+		assert len(data) == len(self)
+		return [f(x) for x in np.split(data, self.year_starts[1:])]
+
+
+_indices = collections.OrderedDict()
+
+# CalendarIndex of dates, reused while the same dates keep being passed in
+def calendar_index(dates, maxsize=16):
+	if isinstance(dates, CalendarIndex):
+		return dates
+
+	dates = np.asarray(dates)
+	key = (dates.dtype.str, len(dates), dates.tobytes())
+	if key in _indices:
+		index = _indices.pop(key)
+	else:
+		index = CalendarIndex(dates)
+	_indices[key] = index
+
+	while len(_indices) > maxsize:
+		_indices.popitem(last=False)
+
+	return index
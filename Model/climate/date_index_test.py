@@ -0,0 +1,32 @@
+import unittest
+import numpy as np
+
+from climate.date_index import CalendarIndex, calendar_index
+
+dates = ['1899-12-30', '1899-12-31', '1900-01-01', '1900-02-01', '1900-12-31', '1901-03-01']
+data = np.array([1., 2., 3., 4., 5., 6.])
+
+
+class TestCalendarIndex(unittest.TestCase):
+
+    def test_years_and_months(self):
+        index = CalendarIndex(dates)
+        self.assertEqual(index.year_list, [1899, 1900, 1901])
+        self.assertEqual(index.year_indices(), [{"start": 0, "end": 2}, {"start": 2, "end": 5}, {"start": 5, "end": 6}])
+        self.assertEqual(index.months.tolist(), [12, 12, 1, 2, 12, 3])
+
+    def test_reductions(self):
+        index = CalendarIndex(dates)
+        self.assertEqual(index.reduce_by_year(data).tolist(), [3., 12., 6.])
+        self.assertEqual(index.reduce_by_year(data, np.maximum).tolist(), [2., 5., 6.])
+        self.assertEqual(index.apply_by_year(data, len), [2, 3, 1])
+
+    def test_reused(self):
+        index = calendar_index(np.array(dates))
+        self.assertTrue(calendar_index(np.array(dates)) is index)
+        self.assertTrue(calendar_index(index) is index)
+        self.assertFalse(calendar_index(np.array(dates[1:])) is index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,63 +1,154 @@
 import numpy as np
 import csv
 import datetime
+import json
 import os
+import zipfile
 from ConfigLoader import *
+from climate.window_stats import window_stats
 
 def moving_average(a, n=3) :
     ret = np.cumsum(a, dtype=float)
     ret[n:] = ret[n:] - ret[:-n]
     return ret[n - 1:] / n
 
-def read_bom_data(file_name, data_col): #remove initial empty rows, fill blanks with pervious value, and create data and dates.
-	dates = []
-	data = []
+# dates and data of the BoM csv file_name, which is read from the zip archive it was extracted from if it isn't extracted
+def read_bom_data(file_name, data_col):
+	path = bom_source(file_name)
 
-	if "climate" in CONFIG.paths:
-		path = CONFIG.paths['climate']
-	else:
-		path = os.path.dirname(__file__)
+	if path.endswith(".zip"):
+		with zipfile.ZipFile(path) as archive:
+			with archive.open(os.path.basename(file_name)) as csvfile:
+				return parse_bom_csv(csvfile, data_col)
 	#end if
 
-	path = path + '/' +file_name
-	
 	with open(path) as csvfile:
-		reader = csv.reader(csvfile)
-		headers = map(str.strip, reader.next())
+		return parse_bom_csv(csvfile, data_col)
 
-		Year_i = headers.index('Year')
-		Month_i = headers.index('Month')
-		Day_i = headers.index('Day')
-		data_i = headers.index(data_col)
+# path of file_name in the climate folder, or of the zip archive of its folder when it hasn't been extracted
+def bom_source(file_name):
+	path = climate_path(file_name)
+	zip_path = os.path.dirname(path) + ".zip"
+	if not os.path.exists(path) and os.path.exists(zip_path):
+		return zip_path
+	return path
 
-		previous = None
+def parse_bom_csv(csvfile, data_col): #remove initial empty rows, fill blanks with pervious value, and create data and dates.
+	dates = []
+	data = []
 
-		for row in reader:
+	reader = csv.reader(csvfile)
+	headers = map(str.strip, reader.next())
+
+	Year_i = headers.index('Year')
+	Month_i = headers.index('Month')
+	Day_i = headers.index('Day')
+	data_i = headers.index(data_col)
+
+	previous = None
 
-			if (row[data_i] == ""):
-				# skip initial empty rows
-				if previous == None: 
-					continue
-				# fill blanks with previous value
-				else:
-					dates.append( "%d-%02d-%02d" % (int(row[Year_i]),int(row[Month_i]),int(row[Day_i])) ) #replace '%'s with a series of value
-					data.append(previous)				
+	for row in reader:
+
+		if (row[data_i] == ""):
+			# skip initial empty rows
+			if previous == None: 
+				continue
+			# fill blanks with previous value
 			else:
-				dates.append( "%d-%02d-%02d" % (int(row[Year_i]),int(row[Month_i]),int(row[Day_i])) )
-				previous = float(row[data_i])
-				data.append(previous)
+				dates.append( "%d-%02d-%02d" % (int(row[Year_i]),int(row[Month_i]),int(row[Day_i])) ) #replace '%'s with a series of value
+				data.append(previous)				
+		else:
+			dates.append( "%d-%02d-%02d" % (int(row[Year_i]),int(row[Month_i]),int(row[Day_i])) )
+			previous = float(row[data_i])
+			data.append(previous)
 
 	return np.array(dates), np.array(data)
 
+# (dates, data) of the data csv in a BoM zip archive (e.g. a new station download), streamed from the archive
+# without extracting it and kept in the binary cache, see cached()
+def read_bom_zip(zip_name, data_col, cache_dir=None):
+	path = climate_path(zip_name)
+
+	def build():
+		with zipfile.ZipFile(path) as archive:
+			member = [name for name in archive.namelist() if name.endswith("_Data.csv")][0]
+			with archive.open(member) as csvfile:
+				dates, data = parse_bom_csv(csvfile, data_col)
+		return {"dates": dates.astype('datetime64[D]'), "data": data}
+
+	name = "bom_" + os.path.splitext(os.path.basename(zip_name))[0]
+	arrays = cached(name, [path], build, cache_dir=cache_dir)
+	return np.datetime_as_string(arrays["dates"]).astype("U10").astype(str), arrays["data"]
+
 def cut(dates, data, start, end):
-	start_i = np.where( dates == start)[0]
-	end_i = np.where( dates == end)[0]
+	start_i = np.where( dates == start)[0][0]
+	end_i = np.where( dates == end)[0][0]
 	return dates[start_i: end_i+1], data[start_i: end_i+1]
 
-def read_all_bom_data():
-	max_temp_dates, max_temp = read_bom_data("IDCJAC0010_055023_1800/IDCJAC0010_055023_1800_Data.csv", "Maximum temperature (Degree C)")
-	min_temp_dates, min_temp = read_bom_data("IDCJAC0011_055023_1800/IDCJAC0011_055023_1800_Data.csv", "Minimum temperature (Degree C)")
-	rain_dates, rain = read_bom_data("IDCJAC0009_055076_1800/IDCJAC0009_055076_1800_Data.csv", "Rainfall amount (millimetres)")
+def climate_path(file_name):
+	if "climate" in CONFIG.paths:
+		path = CONFIG.paths['climate']
+	else:
+		path = os.path.dirname(__file__)
+	#end if
+	return os.path.join(path, file_name)
+
+# dict of arrays from build(), saved as .npy files in cache_dir the first time and memory mapped after that.
+# The cache is rebuilt when the size or modification time of one of the source files changes.
+# Arrays must have numeric or datetime64 dtypes to be memory mapped
+def cached(name, sources, build, cache_dir=None):
+	if cache_dir is None:
+		cache_dir = climate_path("cache")
+	#end if
+
+	signature = [[os.path.basename(source), os.path.getsize(source), os.path.getmtime(source)] for source in sources]
+	manifest_path = os.path.join(cache_dir, name + ".json")
+	array_path = lambda key: os.path.join(cache_dir, "%s.%s.npy" % (name, key))
+
+	try:
+		with open(manifest_path) as f:
+			manifest = json.load(f)
+		if manifest["sources"] == signature:
+			return dict((key, np.load(array_path(key), mmap_mode='r')) for key in manifest["arrays"])
+	except (IOError, ValueError, KeyError):
+		pass
+
+	arrays = build()
+	if not os.path.isdir(cache_dir):
+		os.makedirs(cache_dir)
+	for key, value in arrays.items():
+		np.save(array_path(key), value)
+	# manifest last, so an interrupted write is rebuilt next time
+	with open(manifest_path, 'w') as f:
+		json.dump({"sources": signature, "arrays": sorted(arrays)}, f)
+
+	return dict((key, np.load(array_path(key), mmap_mode='r')) for key in arrays)
+
+bom_files = {
+	"max_temp": ("IDCJAC0010_055023_1800/IDCJAC0010_055023_1800_Data.csv", "Maximum temperature (Degree C)"),
+	"min_temp": ("IDCJAC0011_055023_1800/IDCJAC0011_055023_1800_Data.csv", "Minimum temperature (Degree C)"),
+	"rain": ("IDCJAC0009_055076_1800/IDCJAC0009_055076_1800_Data.csv", "Rainfall amount (millimetres)"),
+}
+
+# (rain_dates, rain, temp) from the binary cache, which is built from the BoM csv files when missing or out of date
+def read_all_bom_data(use_cache=True):
+	if not use_cache:
+		return parse_all_bom_data()
+	#end if
+
+	def build():
+		rain_dates, rain, temp = parse_all_bom_data()
+		return {"dates": rain_dates.astype('datetime64[D]'), "rain": rain, "temp": temp}
+
+	data = cached("bom", [bom_source(file_name) for file_name, data_col in bom_files.values()], build)
+
+	# callers compare and slice the dates as "YYYY-MM-DD" strings, with the native str dtype
+	return np.datetime_as_string(data["dates"]).astype("U10").astype(str), data["rain"], data["temp"]
+
+def parse_all_bom_data():
+	max_temp_dates, max_temp = read_bom_data(*bom_files["max_temp"])
+	min_temp_dates, min_temp = read_bom_data(*bom_files["min_temp"])
+	rain_dates, rain = read_bom_data(*bom_files["rain"])
 
 	start = '1899-01-01'
 	end = '2011-12-27'
@@ -78,7 +169,20 @@ def read_NSW_csv(file_name, skip=1):
 		rows = [row for row in reader]
 		return rows, headers
 
-def read_NSW_data():
+# (sw_dates, sw, gw_dates, gw) from the binary cache, dates are returned as datetime objects
+def read_NSW_data(use_cache=True):
+	if not use_cache:
+		return parse_NSW_data()
+	#end if
+
+	def build():
+		sw_dates, sw, gw_dates, gw = parse_NSW_data()
+		return {"sw_dates": sw_dates.astype('datetime64[s]'), "sw": sw, "gw_dates": gw_dates.astype('datetime64[s]'), "gw": gw}
+
+	data = cached("nsw", [climate_path("SW419051.csv"), climate_path("GW036186.csv")], build)
+	return data["sw_dates"].astype(datetime.datetime), data["sw"], data["gw_dates"].astype(datetime.datetime), data["gw"]
+
+def parse_NSW_data():
 	
 	if "climate" in CONFIG.paths:
 		dirname = CONFIG.paths['climate']
@@ -131,32 +235,49 @@ def read_original_data(file_name, data_col, with_dates=False):
 
 
 def read_climate_projections(file, scenario=1):
-	dates = []
-	rain= []
-	PET = []
+	dates, scenarios, rain, PET = read_all_climate_projections(file)
+	i = scenarios.index(str(scenario))
+	return dates, rain[i], PET[i]
+
+# (dates, scenarios, rain, PET) of every projection in file, rain and PET are scenarios*days arrays.
+# The columns are read in one pass and kept in the binary cache, see cached()
+def read_all_climate_projections(file, cache_dir=None):
+	def build():
+		dates, scenarios, rain, PET = parse_climate_projections(file)
+		return {"dates": dates.astype('datetime64[D]'), "scenarios": np.array(scenarios), "rain": rain, "PET": PET}
+
+	name = "projections_" + os.path.splitext(os.path.basename(file))[0]
+	data = cached(name, [file], build, cache_dir=cache_dir)
+	return np.datetime_as_string(data["dates"]).astype("U10").astype(str), data["scenarios"].astype(str).tolist(), data["rain"], data["PET"]
+
+def parse_climate_projections(file):
 	with open(file) as csvfile:
 		reader = csv.reader(csvfile)
 
-		headers = map(str.strip, reader.next())
+		headers = [header.strip() for header in next(reader)]
 		date_i = headers.index('DATE')
-		rain_i = headers.index('RAI_'+str(scenario))
-		PET_i = headers.index('PET_'+str(scenario))
+		scenarios = [header[len('RAI_'):] for header in headers if header.startswith('RAI_')]
+		rain_i = [headers.index('RAI_'+scenario) for scenario in scenarios]
+		PET_i = [headers.index('PET_'+scenario) for scenario in scenarios]
 
+		dates = []
+		rows = []
 		for row in reader:
-			dt = datetime.datetime.strptime(row[date_i], '%d/%m/%Y') # .strftime('%Y-%m-%d'
-			dates.append( "%d-%02d-%02d" % (dt.year,dt.month,dt.day) )
-			rain.append(float(row[rain_i]))
-			PET.append(float(row[PET_i]))
+			day, month, year = row[date_i].split('/')
+			dates.append( "%d-%02d-%02d" % (int(year),int(month),int(day)) )
+			rows.append(row)
+
+	table = np.array(rows)
+	rain = table[:, rain_i].astype(float).T
+	PET = table[:, PET_i].astype(float).T
 
-	return np.array(dates), np.array(rain), np.array(PET)
+	return np.array(dates), scenarios, rain, PET
 
 
 def find_extremes(data, window): #data = rainfall, identify the starting point of lowest/highest rainfall
-	ma = moving_average(data, window) # left-handed, ie the ith value becomes the mean of the sum of ith to (i+window-1)th values.
-	min_i = np.argmin(ma) #return the index of the minimum ma value
-	med_i = np.argmin(np.abs(ma-np.median(ma))) 
-	max_i = np.argmax(ma) 
-	return min_i, med_i, max_i
+	# window means are left-handed, ie the ith value is the mean of the ith to (i+window-1)th values.
+	# The table is built once per series and window, see climate.window_stats for other ways to choose windows
+	return window_stats(data, window).extremes()
 
 
 def dateifier(date_string):
@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+import numpy as np
+
+from climate import read_climate
+
+
+class TestCached(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.dir, "source.csv")
+        with open(self.source, 'w') as f:
+            f.write("1,2,3\n")
+        self.builds = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def build(self):
+        self.builds += 1
+        return {"dates": np.array(["2001-01-01", "2001-01-02"], dtype='datetime64[D]'), "data": np.array([1., 2.])*self.builds}
+
+    def load(self):
+        return read_climate.cached("test", [self.source], self.build, cache_dir=os.path.join(self.dir, "cache"))
+
+    def test_built_once(self):
+        first = self.load()
+        second = self.load()
+        self.assertEqual(self.builds, 1)
+        self.assertTrue(isinstance(second["data"], np.memmap))
+        self.assertTrue(np.array_equal(first["dates"], second["dates"]))
+        self.assertTrue(np.array_equal(second["data"], [1., 2.]))
+
+    def test_rebuilt_when_source_changes(self):
+        self.load()
+        with open(self.source, 'a') as f:
+            f.write("4,5,6\n")
+        data = self.load()
+        self.assertEqual(self.builds, 2)
+        self.assertTrue(np.array_equal(data["data"], [2., 4.]))
+
+
+class TestClimateProjections(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, "projections.csv")
+        with open(self.file, 'w') as f:
+            f.write("DATE,RAI_1,PET_1,RAI_2,PET_2\n")
+            f.write("31/12/1999,1.5,4.0,0.0,5.0\n")
+            f.write("1/1/2000,0.0,4.5,2.5,5.5\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_all_scenarios(self):
+        dates, scenarios, rain, PET = read_climate.read_all_climate_projections(self.file, cache_dir=os.path.join(self.dir, "cache"))
+        self.assertEqual(list(dates), ["1999-12-31", "2000-01-01"])
+        self.assertEqual(scenarios, ["1", "2"])
+        self.assertTrue(np.array_equal(rain, [[1.5, 0.], [0., 2.5]]))
+        self.assertTrue(np.array_equal(PET, [[4., 4.5], [5., 5.5]]))
+
+        cached_dates, scenarios, cached_rain, cached_PET = read_climate.read_all_climate_projections(self.file, cache_dir=os.path.join(self.dir, "cache"))
+        self.assertTrue(isinstance(cached_rain, np.memmap))
+        self.assertTrue(np.array_equal(cached_rain, rain))
+
+
+class TestBomZip(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.zip = os.path.join(self.dir, "IDCJAC0009_000000_1800.zip")
+        with zipfile.ZipFile(self.zip, 'w') as archive:
+            archive.writestr("IDCJAC0009_000000_1800_Data.csv",
+                "Product code,Bureau of Meteorology station number,Year,Month,Day,Rainfall amount (millimetres),Quality\n"
+                "IDCJAC0009,000000,1899,12,31,,\n"
+                "IDCJAC0009,000000,1900,01,01,2.5,Y\n"
+                "IDCJAC0009,000000,1900,01,02,,\n"
+                "IDCJAC0009,000000,1900,01,03,1.0,Y\n")
+            archive.writestr("IDCJAC0009_000000_1800_Note.txt", "")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_read_zip(self):
+        dates, rain = read_climate.read_bom_zip(self.zip, "Rainfall amount (millimetres)", cache_dir=os.path.join(self.dir, "cache"))
+        self.assertEqual(list(dates), ["1900-01-01", "1900-01-02", "1900-01-03"])
+        self.assertEqual(list(rain), [2.5, 2.5, 1.])
+
+    def test_not_extracted(self):
+        file_name = os.path.join(self.dir, "IDCJAC0009_000000_1800", "IDCJAC0009_000000_1800_Data.csv")
+        self.assertEqual(read_climate.bom_source(file_name), self.zip)
+        dates, rain = read_climate.read_bom_data(file_name, "Rainfall amount (millimetres)")
+        self.assertEqual(list(rain), [2.5, 2.5, 1.])
+
+
+if __name__ == '__main__':
+    unittest.main()
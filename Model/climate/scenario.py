@@ -0,0 +1,77 @@
+"""
+Delta change climate scenarios
+
+A scenario is a window of a base daily record (e.g. read_all_bom_data, whose arrays are memory
+mapped from the binary cache) with monthly rainfall multipliers, monthly temperature offsets
+and a shift of the window start. Only the base arrays and the perturbation parameters are
+held; perturbed values are computed for the days asked for, so many scenarios can share one
+base record. arrays() gives climate_dates, rainfall and PET for run_integrated.
+"""
+import copy
+import numpy as np
+
+from climate.date_index import calendar_index
+
+
+# 12 monthly values from a scalar or a sequence of 12, index 0 is January
+def _monthly(x, default):
+	if x is None:
+		x = default
+	return np.broadcast_to(np.asarray(x, dtype=float), (12,))
+
+class ClimateScenario():
+
+	# window of days days of the base record from start (the whole record by default), shifted by shift days
+	def __init__(self, climate_dates, rainfall, temperature, start=0, days=None, rain_factors=None, temp_offsets=None, shift=0):
+		self.base_dates = climate_dates
+		self.base_rainfall = rainfall
+		self.base_temperature = temperature
+		self.base_months = calendar_index(climate_dates).months
+
+		if days is None:
+			days = len(climate_dates) - start - shift
+		self.start = start + shift
+		self.days = days
+		assert 0 <= self.start and self.start + days <= len(climate_dates), "window outside the base record"
+
+		self.rain_factors = _monthly(rain_factors, 1.)
+		self.temp_offsets = _monthly(temp_offsets, 0.)
+
+	def __len__(self):
+		return self.days
+
+	# new scenario on the same base record and window, with other perturbations
+	def perturb(self, rain_factors=None, temp_offsets=None, shift=0):
+		scenario = copy.copy(self)
+		scenario.start = self.start + shift
+		assert 0 <= scenario.start and scenario.start + self.days <= len(self.base_dates), "window outside the base record"
+		scenario.rain_factors = _monthly(rain_factors, 1.)
+		scenario.temp_offsets = _monthly(temp_offsets, 0.)
+		return scenario
+
+	def _days(self, start, end):
+		if end is None:
+			end = self.days
+		return slice(self.start + start, self.start + min(end, self.days))
+
+	# dates of the window, a view of the base dates
+	def climate_dates(self, start=0, end=None):
+		return self.base_dates[self._days(start, end)]
+
+	# perturbed rainfall of days start to end of the window
+	def rainfall(self, start=0, end=None):
+		days = self._days(start, end)
+		return self.base_rainfall[days]*self.rain_factors[self.base_months[days] - 1]
+
+	def temperature(self, start=0, end=None):
+		days = self._days(start, end)
+		return self.base_temperature[days] + self.temp_offsets[self.base_months[days] - 1]
+
+	# (climate_dates, rainfall, temperature) of consecutive chunks of size days
+	def chunks(self, size=365):
+		for start in range(0, self.days, size):
+			yield self.climate_dates(start, start + size), self.rainfall(start, start + size), self.temperature(start, start + size)
+
+	# climate_dates, rainfall, PET of the whole window, as run_integrated takes them (climate_type="temperature")
+	def arrays(self):
+		return self.climate_dates(), self.rainfall(), self.temperature()
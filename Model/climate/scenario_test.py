@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+
+from climate.scenario import ClimateScenario
+
+dates = np.arange(np.datetime64('1999-12-01'), np.datetime64('2001-01-01')).astype(str)
+rainfall = np.arange(len(dates), dtype=float)
+temperature = np.ones(len(dates))*20.
+
+
+class TestClimateScenario(unittest.TestCase):
+
+    def test_unperturbed(self):
+        scenario = ClimateScenario(dates, rainfall, temperature, start=10, days=100)
+        climate_dates, rain, temp = scenario.arrays()
+        self.assertTrue(np.array_equal(climate_dates, dates[10:110]))
+        self.assertTrue(np.array_equal(rain, rainfall[10:110]))
+        self.assertTrue(np.array_equal(temp, temperature[10:110]))
+
+    def test_monthly_perturbations(self):
+        factors = np.arange(1., 13.)
+        scenario = ClimateScenario(dates, rainfall, temperature, rain_factors=factors, temp_offsets=1.5)
+        rain = scenario.rainfall()
+        # December 1999 then January 2000
+        self.assertEqual(rain[0], 0.*12.)
+        self.assertEqual(rain[31], 31.*1.)
+        self.assertTrue(np.all(scenario.temperature() == 21.5))
+
+    def test_shift_and_chunks(self):
+        scenario = ClimateScenario(dates, rainfall, temperature, start=0, days=100)
+        shifted = scenario.perturb(rain_factors=2., shift=31)
+        self.assertEqual(shifted.climate_dates()[0], '2000-01-01')
+        self.assertTrue(np.array_equal(shifted.rainfall(), 2.*rainfall[31:131]))
+        chunks = list(shifted.chunks(30))
+        self.assertEqual(len(chunks), 4)
+        self.assertTrue(np.array_equal(np.concatenate([rain for d, rain, t in chunks]), shifted.rainfall()))
+        self.assertRaises(AssertionError, scenario.perturb, shift=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Stochastic daily weather generator
+
+Fitted to a daily record such as read_all_bom_data (Richardson type generator):
+- rain occurrence is a first order Markov chain with transition probabilities for each month
+- wet day amounts are gamma distributed, with a shape and scale for each month
+- temperature is a monthly mean and standard deviation, conditioned on whether the day is wet,
+  plus AR(1) anomalies
+
+Replicates are generated together, so thousands of years cost one pass over the days of a
+replicate. generate() returns climate_dates, rainfall and temperature in the form
+run_integrated expects (climate_type="temperature").
+"""
+import numpy as np
+from scipy.signal import lfilter
+
+from climate.date_index import calendar_index
+from climate.read_climate import read_all_bom_data
+
+
+# Thom's approximate maximum likelihood estimate of the gamma shape and scale of x > 0
+def fit_gamma(x):
+	x = np.asarray(x, dtype=float)
+	mean = np.mean(x)
+	A = np.log(mean) - np.mean(np.log(x))
+	shape = (1. + np.sqrt(1. + 4.*A/3.))/(4.*A)
+	return shape, mean/shape
+
+
+class WeatherGenerator():
+
+	# dates as climate_dates, days with at least wet_day mm of rain are wet
+	def __init__(self, dates, rainfall, temperature, wet_day=0.2):
+		months = calendar_index(dates).months
+		rainfall = np.asarray(rainfall, dtype=float)
+		temperature = np.asarray(temperature, dtype=float)
+		wet = rainfall >= wet_day
+		self.wet_day = wet_day
+
+		# parameters for each month, index 0 is January
+		self.p01 = np.empty(12) # P(wet | previous day dry)
+		self.p11 = np.empty(12) # P(wet | previous day wet)
+		self.shape = np.empty(12)
+		self.scale = np.empty(12)
+		self.temp_mean = np.empty((12, 2)) # [month, wet]
+		self.temp_std = np.empty((12, 2))
+
+		previous = np.append(False, wet[:-1])
+		for m in range(12):
+			days = months == m + 1
+			self.p01[m] = np.mean(wet[days & ~previous]) if np.any(days & ~previous) else 0.
+			self.p11[m] = np.mean(wet[days & previous]) if np.any(days & previous) else 0.
+			self.shape[m], self.scale[m] = fit_gamma(rainfall[days & wet])
+			for w in [0, 1]:
+				t = temperature[days & (wet == w)]
+				self.temp_mean[m, w] = np.mean(t)
+				self.temp_std[m, w] = np.std(t)
+
+		# lag 1 autocorrelation of the standardised temperature anomalies
+		z = (temperature - self.temp_mean[months - 1, wet.astype(int)])/self.temp_std[months - 1, wet.astype(int)]
+		self.phi = np.corrcoef(z[:-1], z[1:])[0, 1]
+
+	# (climate_dates, rainfall, temperature) of days days from start ("YYYY-MM-DD"). With replicates the rainfall
+	# and temperature are replicates*days, all replicates share the dates. The same seed gives the same weather
+	def generate(self, start, days, replicates=None, seed=None):
+		random_state = np.random.RandomState(seed)
+		n = 1 if replicates is None else replicates
+
+		dates = np.arange(np.datetime64(start, 'D'), np.datetime64(start, 'D') + days)
+		m = calendar_index(dates).months - 1
+
+		# occurrence, the chain starts from the stationary wet probability of the first month
+		u = random_state.uniform(size=(n, days))
+		wet = np.empty((n, days), dtype=bool)
+		wet[:, 0] = u[:, 0] < self.p01[m[0]]/(1. - self.p11[m[0]] + self.p01[m[0]])
+		for k in range(1, days):
+			wet[:, k] = u[:, k] < np.where(wet[:, k-1], self.p11[m[k]], self.p01[m[k]])
+
+		amounts = random_state.gamma(np.broadcast_to(self.shape[m], (n, days)))*self.scale[m]
+		rainfall = np.where(wet, np.maximum(amounts, self.wet_day), 0.)
+
+		# stationary AR(1) anomalies
+		e = random_state.standard_normal((n, days))
+		e[:, 0] /= np.sqrt(1. - self.phi**2)
+		z = lfilter([np.sqrt(1. - self.phi**2)], [1., -self.phi], e, axis=-1)
+		w = wet.astype(int)
+		temperature = self.temp_mean[m, w] + self.temp_std[m, w]*z
+
+		climate_dates = np.datetime_as_string(dates).astype("U10").astype(str)
+		if replicates is None:
+			return climate_dates, rainfall[0], temperature[0]
+		return climate_dates, rainfall, temperature
+
+# generator fitted to the 1899-2011 BoM record of read_all_bom_data
+def bom_weather_generator():
+	climate_dates, rainfall, temperature = read_all_bom_data()
+	return WeatherGenerator(climate_dates, rainfall, temperature)
@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+
+from climate.weather_generator import WeatherGenerator, fit_gamma
+
+rs = np.random.RandomState(3)
+dates = np.arange(np.datetime64('1950-01-01'), np.datetime64('1980-01-01')).astype(str)
+days = len(dates)
+wet = rs.rand(days) < 0.3
+rainfall = np.where(wet, 0.2 + rs.gamma(0.8, 8., days), 0.)
+temperature = 18. + 8.*np.sin(2*np.pi*np.arange(days)/365.25) - 2.*wet + rs.randn(days)
+
+
+class TestWeatherGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.generator = WeatherGenerator(dates, rainfall, temperature)
+
+    def test_fit_gamma(self):
+        shape, scale = fit_gamma(rs.gamma(2., 3., 100000))
+        self.assertAlmostEqual(shape, 2., delta=0.05)
+        self.assertAlmostEqual(scale, 3., delta=0.1)
+
+    def test_generate(self):
+        climate_dates, rain, temp = self.generator.generate('2000-01-01', 3650, replicates=200, seed=1)
+        self.assertEqual(climate_dates[0], '2000-01-01')
+        self.assertEqual(rain.shape, (200, 3650))
+        self.assertAlmostEqual(np.mean(rain > 0), np.mean(wet), delta=0.01)
+        self.assertAlmostEqual(np.mean(rain), np.mean(rainfall), delta=0.1)
+        self.assertAlmostEqual(np.mean(temp), np.mean(temperature), delta=0.2)
+
+    def test_seed(self):
+        a = self.generator.generate('2000-01-01', 365, seed=5)
+        b = self.generator.generate('2000-01-01', 365, seed=5)
+        self.assertEqual(a[1].shape, (365,))
+        self.assertTrue(np.array_equal(a[1], b[1]))
+        self.assertTrue(np.array_equal(a[2], b[2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
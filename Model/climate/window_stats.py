@@ -0,0 +1,101 @@
+"""
+Statistics of every climate window of a given length
+
+Scenarios run the model on a window of the historical record (e.g. 12 years of the 1899-2011
+BoM rainfall). The table holds, for every possible start index, the window mean and its
+percentile rank, the share of rain falling in the summer months, the fraction of dry days and
+the driest 12 months inside the window. Everything is built with cumulative sums and a
+blockwise sliding minimum, so choosing a window by any criterion is a lookup.
+"""
+import collections
+import numpy as np
+
+from climate.date_index import calendar_index
+
+
+# sums of x over every window of length n
+def window_sums(x, n):
+	c = np.concatenate(([0.], np.cumsum(x, dtype=float)))
+	return c[n:] - c[:-n]
+
+# minimum of x over every window of length n (van Herk/Gil-Werman, prefix and suffix minimums of blocks of n)
+def sliding_min(x, n):
+	x = np.asarray(x, dtype=float)
+	blocks = -(-len(x)//n)
+	padded = np.append(x, np.full(blocks*n - len(x), np.inf)).reshape(blocks, n)
+	prefix = np.minimum.accumulate(padded, axis=1).ravel()
+	suffix = np.minimum.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+	starts = np.arange(len(x) - n + 1)
+	return np.minimum(suffix[starts], prefix[starts + n - 1])
+
+
+class WindowStats():
+
+	# data is daily rainfall, dates (optional) are needed for the seasonal statistics
+	def __init__(self, data, window, dates=None, dry_day=1., drought_days=365, summer_months=(10, 11, 12, 1, 2, 3)):
+		data = np.asarray(data, dtype=float)
+		assert window <= len(data)
+		self.window = window
+
+		# same values as read_climate.moving_average
+		self.total = window_sums(data, window)
+		self.mean = self.total/window
+
+		# percentile rank of each window mean, 0 for the driest and 100 for the wettest window
+		self.order = np.argsort(self.mean, kind='mergesort')
+		self.rank = np.empty(len(self.mean))
+		self.rank[self.order] = 100.*np.arange(len(self.mean))/max(len(self.mean) - 1, 1)
+
+		self.dry_days = window_sums(data < dry_day, window)/window
+
+		# lowest rainfall total over drought_days consecutive days within the window
+		if drought_days <= window:
+			self.driest_period = sliding_min(window_sums(data, drought_days), window - drought_days + 1)
+		else:
+			self.driest_period = None
+		#end if
+
+		if dates is not None:
+			summer = np.in1d(calendar_index(dates).months, summer_months)
+			with np.errstate(invalid='ignore', divide='ignore'):
+				self.summer_fraction = window_sums(data*summer, window)/self.total
+		else:
+			self.summer_fraction = None
+		#end if
+
+	def __len__(self):
+		return len(self.mean)
+
+	# start index of the window at the qth percentile of window means
+	def percentile(self, q):
+		return int(self.order[int(round(q/100.*(len(self.order) - 1)))])
+
+	# start index of the window with the lowest (or highest) value of a statistic, e.g. "driest_period" for the worst drought
+	def argmin(self, statistic="mean"):
+		return int(np.nanargmin(getattr(self, statistic)))
+
+	def argmax(self, statistic="mean"):
+		return int(np.nanargmax(getattr(self, statistic)))
+
+	# start indices of the lowest, closest to median and highest mean windows, as read_climate.find_extremes
+	def extremes(self):
+		med_i = np.argmin(np.abs(self.mean - np.median(self.mean)))
+		return self.argmin(), int(med_i), self.argmax()
+
+
+_tables = collections.OrderedDict()
+
+# WindowStats of data for window, built once and reused while the same series and window are asked for
+def window_stats(data, window, dates=None, maxsize=8, **kwargs):
+	data = np.asarray(data, dtype=float)
+	key = (window, len(data), data.tobytes(), None if dates is None else np.asarray(dates).tobytes(), tuple(sorted(kwargs.items())))
+	if key in _tables:
+		table = _tables.pop(key)
+	else:
+		table = WindowStats(data, window, dates=dates, **kwargs)
+	_tables[key] = table
+
+	while len(_tables) > maxsize:
+		_tables.popitem(last=False)
+
+	return table
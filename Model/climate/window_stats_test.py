@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+
+from climate.window_stats import WindowStats, window_stats, sliding_min
+
+rs = np.random.RandomState(7)
+rainfall = rs.gamma(0.3, 10., 3000)*(rs.rand(3000) < 0.3)
+window = 400
+
+
+class TestWindowStats(unittest.TestCase):
+
+    def test_mean(self):
+        stats = WindowStats(rainfall, window)
+        means = [np.mean(rainfall[i:i + window]) for i in range(len(rainfall) - window + 1)]
+        self.assertTrue(np.allclose(stats.mean, means))
+        self.assertEqual(stats.extremes()[0], np.argmin(means))
+        self.assertEqual(stats.extremes()[2], np.argmax(means))
+
+    def test_percentile(self):
+        stats = WindowStats(rainfall, window)
+        self.assertEqual(stats.percentile(0), stats.argmin())
+        self.assertEqual(stats.percentile(100), stats.argmax())
+        self.assertEqual(stats.rank[stats.percentile(100)], 100.)
+        self.assertTrue(stats.mean[stats.percentile(10)] <= stats.mean[stats.percentile(90)])
+
+    def test_driest_period(self):
+        stats = WindowStats(rainfall, window, drought_days=30)
+        totals = np.convolve(rainfall, np.ones(30), 'valid')
+        i = 123
+        self.assertAlmostEqual(stats.driest_period[i], totals[i:i + window - 29].min())
+
+    def test_sliding_min(self):
+        for n in [1, 3, 10]:
+            self.assertTrue(np.array_equal(sliding_min(rainfall[:50], n), [rainfall[i:i + n].min() for i in range(51 - n)]))
+
+    def test_reused(self):
+        self.assertTrue(window_stats(rainfall, window) is window_stats(rainfall.copy(), window))
+
+
+if __name__ == '__main__':
+    unittest.main()
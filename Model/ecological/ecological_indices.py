@@ -6,6 +6,7 @@ import csv
 # namoimodel10_dss.r takes about 5 min so we implemented in python here
 
 from ConfigLoader import *
+from climate.date_index import calendar_index
 
 dirname = CONFIG.paths["ecological"] if "ecological" in CONFIG.paths else os.path.dirname(__file__)
 
@@ -83,12 +84,13 @@ def daily_values_from_events(flood_events, dates):
 	duration_values = np.zeros((len(dates)))
 	dry_values = np.zeros((len(dates)))
 
+	months = calendar_index(dates).months
+
 	for event in flood_events:
-		for day in range(int(event["duration"])):
-			i = event["index"]+day
-			timing_values[i] = datetime.datetime.strptime(dates[i], "%Y-%m-%d").month
-			duration_values[i] = event["duration"]
-			dry_values[i] = event["preceding dry"]
+		days = slice(event["index"], event["index"]+int(event["duration"]))
+		timing_values[days] = months[days]
+		duration_values[days] = event["duration"]
+		dry_values[days] = event["preceding dry"]
 
 	return timing_values, duration_values, dry_values
 
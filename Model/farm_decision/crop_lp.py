@@ -0,0 +1,176 @@
+"""
+Warm started simplex solver for the crop choice LP
+
+The farm LP has a fixed shape for a crop table: minimise C.x subject to A.x <= b, x >= 0, with
+a row for each water licence and for each season and irrigation type area. b (licences and
+areas) is never negative, so the all slack basis is always feasible and no phase 1 is needed.
+Within a run only C (prices) and b (water allocations) change from year to year, and the
+optimal basis rarely does, so the last optimal basis is kept and the next solve starts from it.
+A solve is then one factorisation and an optimality check, plus the odd pivot.
+"""
+import collections
+import numpy as np
+
+
+class CropLPResult():
+
+	# y are the simplex multipliers c_B.B^-1 of the rows (<= 0 at a minimum), so fun = y.b
+	def __init__(self, x, fun, basis, B_inv, y=None, status=0):
+		self.x = x
+		self.fun = fun
+		self.y = y
+		self.basis = basis
+		self.B_inv = B_inv
+		self.status = status
+		self.success = status == 0
+
+	# range of each element of b over which this basis stays optimal, so y are the marginal values of the rows.
+	# (lower, upper) arrays, infinite where b can change without bound
+	def rhs_ranges(self, b):
+		b = np.asarray(b, dtype=float)
+		x_B = np.maximum(self.B_inv.dot(b), 0.)
+		with np.errstate(divide="ignore", invalid="ignore"):
+			# x_B + delta*B_inv[:, i] >= 0 for a change delta of b[i]
+			steps = -x_B[:, None]/self.B_inv
+		lower = np.where(self.B_inv > 1e-12, steps, -np.inf).max(axis=0)
+		upper = np.where(self.B_inv < -1e-12, steps, np.inf).min(axis=0)
+		return b + lower, b + upper
+
+
+class CropLP():
+
+	def __init__(self, A, tol=1e-9):
+		self.A = np.asarray(A, dtype=float)
+		self.m, self.n = self.A.shape
+		# structural columns then slack columns
+		self.M = np.hstack((self.A, np.eye(self.m)))
+		self.tol = tol
+		self.basis = None
+		self.pivots = 0
+
+	# minimise C.x subject to A.x <= b, x >= 0, starting from the last optimal basis when it is feasible for b
+	def solve(self, C, b, maxiter=1000):
+		c = np.concatenate((np.asarray(C, dtype=float), np.zeros(self.m)))
+		b = np.asarray(b, dtype=float)
+		assert np.all(b >= 0), "the all slack basis needs b >= 0"
+
+		basis = None
+		if self.basis is not None:
+			B_inv = np.linalg.inv(self.M[:, self.basis])
+			if np.all(B_inv.dot(b) >= -self.tol*(1. + np.abs(b).max())):
+				basis = list(self.basis)
+		if basis is None:
+			basis = list(range(self.n, self.n + self.m))
+
+		for iteration in range(maxiter):
+			B_inv = np.linalg.inv(self.M[:, basis])
+			x_B = B_inv.dot(b)
+			# reduced costs
+			y = c[basis].dot(B_inv)
+			d = c - y.dot(self.M)
+			d[basis] = 0.
+
+			# Bland's rule, the first improving column and the first of tied leaving rows, so degenerate pivots don't cycle
+			improving = np.flatnonzero(d < -self.tol*(1. + np.abs(c).max()))
+			if len(improving) == 0:
+				break
+			entering = improving[0]
+
+			u = B_inv.dot(self.M[:, entering])
+			rows = np.flatnonzero(u > self.tol)
+			if len(rows) == 0:
+				return CropLPResult(None, -np.inf, basis, B_inv, status=3)
+			ratios = np.maximum(x_B[rows], 0.)/u[rows]
+			ties = rows[ratios <= ratios.min() + self.tol]
+			leaving = ties[np.argmin(np.array(basis)[ties])]
+
+			basis[leaving] = entering
+			self.pivots += 1
+		else:
+			return CropLPResult(None, np.nan, basis, B_inv, status=1)
+
+		x = np.zeros(self.n + self.m)
+		x[basis] = np.maximum(x_B, 0.)
+		self.basis = basis
+		return CropLPResult(x[:self.n], c[:self.n].dot(x[:self.n]), list(basis), B_inv, y=y)
+
+	# range of each element of C over which the x of res (a solve of C) stays optimal, (lower, upper) arrays
+	def cost_ranges(self, res, C):
+		C = np.asarray(C, dtype=float)
+		n = self.n
+		c = np.concatenate((C, np.zeros(self.m)))
+		tableau = res.B_inv.dot(self.M)
+		d = c - c[res.basis].dot(tableau)
+		nonbasic = np.ones(len(c), dtype=bool)
+		nonbasic[res.basis] = False
+
+		# a nonbasic crop stays out until its cost falls by its reduced cost
+		lower = C - np.where(nonbasic[:n], np.maximum(d[:n], 0.), np.inf)
+		upper = np.where(nonbasic[:n], np.inf, C)
+		for r, j in enumerate(res.basis):
+			if j >= n:
+				continue
+			# changing the cost of a basic crop by delta changes the reduced costs by -delta*tableau[r]
+			row = np.where(nonbasic, tableau[r], 0.)
+			with np.errstate(divide="ignore", invalid="ignore"):
+				steps = np.maximum(d, 0.)/row
+			lower[j] = C[j] + np.where(row < -1e-12, steps, -np.inf).max()
+			upper[j] = C[j] + np.where(row > 1e-12, steps, np.inf).min()
+		return lower, upper
+
+	# minimise each row of C subject to A.x <= the row of b. Identical instances are solved once, and the optimal basis of
+	# each simplex solve is checked against all the instances left at once, which takes every instance it is optimal for.
+	# Returns x (instances*n) and fun (instances), nan where a solve failed
+	def solve_batch(self, C, b):
+		C, b = np.atleast_2d(np.asarray(C, dtype=float), np.asarray(b, dtype=float))
+		instances = max(len(C), len(b))
+		C = np.broadcast_to(C, (instances, self.n))
+		b = np.broadcast_to(b, (instances, self.m))
+		assert np.all(b >= 0), "the all slack basis needs b >= 0"
+
+		unique, inverse = np.unique(np.hstack((C, b)), axis=0, return_inverse=True)
+		C, b = unique[:, :self.n], unique[:, self.n:]
+		c = np.hstack((C, np.zeros((len(unique), self.m))))
+		b_tol = self.tol*(1. + np.abs(b).max(axis=1))
+		c_tol = self.tol*(1. + np.abs(c).max(axis=1))
+
+		x = np.full((len(unique), self.n), np.nan)
+		remaining = np.arange(len(unique))
+		while len(remaining) > 0:
+			res = self.solve(C[remaining[0]], b[remaining[0]])
+			if not res.success:
+				remaining = remaining[1:]
+				continue
+
+			# feasible and optimal with the same basis
+			x_B = b[remaining].dot(res.B_inv.T)
+			y = c[remaining][:, res.basis].dot(res.B_inv)
+			d = c[remaining] - y.dot(self.M)
+			solved = np.all(x_B >= -b_tol[remaining, None], axis=1) & np.all(d >= -c_tol[remaining, None], axis=1)
+			solved[0] = True
+
+			x_solved = np.zeros((np.sum(solved), self.n + self.m))
+			x_solved[:, res.basis] = np.maximum(x_B[solved], 0.)
+			x[remaining[solved]] = x_solved[:, :self.n]
+			remaining = remaining[~solved]
+
+		fun = np.sum(C*x, axis=1)
+		return x[inverse], fun[inverse]
+
+
+_solvers = collections.OrderedDict()
+
+# CropLP of the constraint matrix A, kept (with its last optimal basis) while the same A keeps being solved
+def crop_lp(A, maxsize=32):
+	A = np.ascontiguousarray(A, dtype=float)
+	key = (A.shape, A.tobytes())
+	if key in _solvers:
+		solver = _solvers.pop(key)
+	else:
+		solver = CropLP(A)
+	_solvers[key] = solver
+
+	while len(_solvers) > maxsize:
+		_solvers.popitem(last=False)
+
+	return solver
@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+from scipy.optimize import linprog
+
+from farm_decision.crop_lp import CropLP, crop_lp
+from farm_decision.crop_table import crop_table_from_dicts
+from farm_decision.farm_optimize import maximum_profit
+
+crops = crop_table_from_dicts([
+    {"name": "COTTON", "season": "Summer", "area type": "flood", "water use (ML/ha)": 7., "yield (units/ha)": 9., "price ($/unit)": 500., "cost ($/ha)": 2600.},
+    {"name": "MAIZE", "season": "Summer", "area type": "flood", "water use (ML/ha)": 7.2, "yield (units/ha)": 9.5, "price ($/unit)": 280., "cost ($/ha)": 1300.},
+    {"name": "SORGHUM", "season": "Summer", "area type": "flood", "water use (ML/ha)": 4.2, "yield (units/ha)": 8., "price ($/unit)": 240., "cost ($/ha)": 880.},
+    {"name": "CHICKPEA", "season": "Winter", "area type": "dryland", "water use (ML/ha)": 0., "yield (units/ha)": 1.4, "price ($/unit)": 460., "cost ($/ha)": 360.},
+    {"name": "WHEAT", "season": "Winter", "area type": "flood", "water use (ML/ha)": 3.5, "yield (units/ha)": 6.8, "price ($/unit)": 250., "cost ($/ha)": 920.},
+]).expand_by_WUE({"flood": 65., "spray": 80.})
+
+
+# reference solution from scipy
+def reference(C, A, b):
+    try:
+        return linprog(C, A_ub=A, b_ub=b, method="highs")
+    except ValueError:
+        return linprog(C, A_ub=A, b_ub=b, method="interior-point", options={"tol": 1e-11})
+
+
+class TestCropLP(unittest.TestCase):
+
+    def test_against_linprog(self):
+        rs = np.random.RandomState(1)
+        for k in range(50):
+            table = crops.with_prices(crops.price_med*rs.uniform(0.5, 1.5, crops.price_med.shape))
+            farm_area = {"flood": rs.uniform(0, 5000), "spray": rs.uniform(0, 2000), "drip": 0., "dryland": 12.6}
+            water_licence = {"surface": rs.uniform(0, 2000), "ground": rs.uniform(0, 3000)*(k % 5 > 0)}
+            C, A, b = table.lp_matrices(farm_area, water_licence)
+
+            res = crop_lp(A).solve(C, b)
+            self.assertTrue(res.success)
+            self.assertTrue(np.all(A.dot(res.x) <= b + 1e-6))
+            self.assertAlmostEqual(res.fun, reference(C, A, b).fun, delta=1e-6*abs(res.fun) + 1e-6)
+            self.assertAlmostEqual(maximum_profit(table, farm_area, water_licence, solver="basis"), -res.fun, delta=1e-6*abs(res.fun))
+
+    def test_warm_start(self):
+        farm_area = {"flood": 5000., "spray": 1000., "drip": 0., "dryland": 12.6}
+        C, A, b = crops.lp_matrices(farm_area, {"surface": 1400., "ground": 2200.})
+        solver = CropLP(A)
+        solver.solve(C, b)
+        pivots = solver.pivots
+        # the optimal basis doesn't change with a small change in allocation
+        res = solver.solve(C, b*np.where(np.arange(len(b)) < 2, 0.9, 1.))
+        self.assertEqual(solver.pivots, pivots)
+        self.assertAlmostEqual(res.fun, reference(C, A, b*np.where(np.arange(len(b)) < 2, 0.9, 1.)).fun, delta=1e-6*abs(res.fun))
+
+    def test_unknown_solver(self):
+        self.assertRaises(ValueError, maximum_profit, crops, {"flood": 1., "spray": 1., "drip": 0., "dryland": 1.}, {"surface": 1., "ground": 1.}, solver="greedy")
+
+
+if __name__ == '__main__':
+    unittest.main()
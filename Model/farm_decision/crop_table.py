@@ -0,0 +1,320 @@
+"""
+Columnar crop table for the farm LP
+
+The crops of chosen_crops.csv as numpy arrays, one row per crop, rather than a list of dicts.
+The csv is read once per session. Expanding crops by irrigation type and input water, trending
+prices and building the LP cost vector and constraint matrix are array operations, and return
+new tables so a loaded table can be shared by every run.
+Yields and prices are crops*units arrays, for crops sold as more than one product.
+Crop catalogs (dpi_budget_crops.csv, powell_crops.csv, rebecca_thesis_crops.csv, ...) are read
+by read_crop_catalog and merged with concatenate_tables, and large tables give a sparse LP.
+"""
+import csv
+import json
+import os
+import numpy as np
+import scipy.sparse
+
+
+water_cost = {
+	'surface': .8,  # $/ML
+	'ground' : 1.6,  # $/ML
+	'dryland': 0,
+}
+
+seasons = ["Summer", "Winter"]
+area_types = ["flood", "spray", "drip"]
+input_waters = ["surface", "ground"]
+
+# area types of the catalogs, as the LP names them
+area_type_aliases = {
+	"flood_irrigation": "flood",
+	"flood irrigation": "flood",
+	"spray_irrigation": "spray",
+	"spray irrigation": "spray",
+	"drip_irrigation": "drip",
+	"drip irrigation": "drip",
+}
+
+# season of catalog crops without one, from the first of these words in the name outside brackets
+season_keywords = [
+	("winter", "Winter"), ("summer", "Summer"),
+	("wheat", "Winter"), ("barley", "Winter"), ("chickpea", "Winter"), ("faba", "Winter"), ("canola", "Winter"),
+	("cotton", "Summer"), ("sorghum", "Summer"), ("maize", "Summer"), ("soybean", "Summer"),
+]
+
+fields = ["names", "seasons", "area_types", "input_water_types", "water_use", "yields", "prices", "price_med", "costs", "gross_margin"]
+
+
+class CropTable():
+
+	def __init__(self, names, seasons, area_types, input_water_types, water_use, yields, prices, price_med, costs, gross_margin):
+		self.names = np.asarray(names)
+		self.seasons = np.asarray(seasons)
+		self.area_types = np.asarray(area_types)
+		self.input_water_types = np.asarray(input_water_types)
+		self.water_use = np.asarray(water_use, dtype=float)
+		self.yields = np.asarray(yields, dtype=float)
+		self.prices = np.asarray(prices, dtype=float)
+		self.price_med = np.asarray(price_med, dtype=float)
+		self.costs = np.asarray(costs, dtype=float)
+		self.gross_margin = np.asarray(gross_margin, dtype=float)
+
+	def __len__(self):
+		return len(self.names)
+
+	# table with some fields replaced
+	def replace(self, **changes):
+		columns = dict((field, getattr(self, field)) for field in fields)
+		columns.update(changes)
+		return CropTable(**columns)
+
+	# table of the crops at rows
+	def take(self, rows):
+		return CropTable(**dict((field, getattr(self, field)[rows]) for field in fields))
+
+	# revenue ($/ha) of each crop
+	def revenue(self):
+		return np.sum(self.yields*self.prices, axis=1)
+
+	def water_costs(self):
+		return self.water_use*np.array([water_cost[t] for t in self.input_water_types], dtype=float)
+
+	# profit ($/ha) of each crop, after costs and the cost of water
+	def profit(self):
+		return self.revenue() - self.costs - self.water_costs()
+
+	# one crop per irrigation type (flood, spray) and input water (surface, ground) for each irrigated crop, as load_chosen_crops did.
+	# Water use is scaled by the WUE of the irrigation type, relative to the med WUE of WUE_scenarios or to 100%
+	def expand_by_WUE(self, WUE, WUE_scenarios=None):
+		irrigated = self.water_use > 0
+		rows = np.repeat(np.arange(len(self)), np.where(irrigated, 4, 1))
+		expanded = self.take(rows)
+
+		# flood surface, flood ground, spray surface, spray ground for each irrigated crop
+		copy_i = np.concatenate([np.arange(4) if i else [0] for i in irrigated]).astype(int) if len(self) else np.array([], dtype=int)
+		irrigated = irrigated[rows]
+		irrigation_type = np.where(copy_i < 2, "flood", "spray")
+
+		if WUE_scenarios is not None:
+			reference = np.array([WUE_scenarios[t]['med'] if i else 1. for t, i in zip(expanded.area_types, irrigated)], dtype=float)
+		else:
+			reference = 100.
+		#end if
+		scale = reference/np.array([WUE[t] for t in irrigation_type], dtype=float)
+
+		return expanded.replace(
+			water_use=np.where(irrigated, scale*expanded.water_use, expanded.water_use),
+			area_types=np.where(irrigated, irrigation_type, "dryland"),
+			input_water_types=np.where(irrigated, np.where(copy_i % 2 == 0, "surface", "ground"), "dryland"),
+		)
+
+	# table with med prices scaled by crop_price_scale
+	def scale_price_med(self, crop_price_scale):
+		return self.replace(price_med=crop_price_scale*self.price_med)
+
+	# prices in year of years: the med price when crop_trend is "flat", or trending down or up 20% over the years
+	def trended_prices(self, crop_trend, year, years):
+		if crop_trend == "flat":
+			return self.price_med
+		elif crop_trend == "down":
+			return self.price_med - 0.2 * self.price_med * (year+1.0) / years
+		elif crop_trend == "up":
+			return self.price_med + 0.2 * self.price_med * (year+1.0) / years
+		return self.prices
+
+	def with_prices(self, prices):
+		return self.replace(prices=prices)
+
+	# C, A and b of the LP maximising profit subject to water licences and the area of each irrigation type in each season
+	def lp_matrices(self, farm_area, water_licence):
+		A = []
+		# water use must be less than licence
+		for input_water in input_waters:
+			A.append((self.input_water_types == input_water)*self.water_use)
+
+		# total area farmed each season must be less than farm area for each type of irrigation
+		for season in seasons:
+			in_season = self.seasons == season
+			for area_type in area_types:
+				A.append((in_season & (self.area_types == area_type)).astype(float))
+			# dryland crops may grow on any type
+			A.append(in_season.astype(float))
+
+		return self.lp_costs(), np.array(A), lp_rhs(farm_area, water_licence)
+
+	# lp_matrices with A as a scipy.sparse.csr_matrix, built from the nonzeros, for tables of thousands of crops
+	def lp_sparse(self, farm_area, water_licence):
+		crops = np.arange(len(self))
+		rows, columns, values = [], [], []
+
+		def add(in_row, coefficients):
+			rows.append(np.full(np.sum(in_row), len(rows), dtype=int))
+			columns.append(crops[in_row])
+			values.append(coefficients[in_row])
+
+		for input_water in input_waters:
+			add((self.input_water_types == input_water) & (self.water_use != 0), self.water_use)
+		ones = np.ones(len(self))
+		for season in seasons:
+			in_season = self.seasons == season
+			for area_type in area_types:
+				add(in_season & (self.area_types == area_type), ones)
+			add(in_season, ones)
+
+		A = scipy.sparse.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))), shape=(len(rows), len(self)))
+		return self.lp_costs(), A, lp_rhs(farm_area, water_licence)
+
+	# C of the LP, cost ($/ha) for each crop as the optimisation runs on minimising.
+	# prices may be instances*crops*units, giving a row of C for each instance
+	def lp_costs(self, prices=None):
+		if prices is None:
+			prices = self.prices
+		return self.costs + self.water_costs() - np.sum(self.yields*np.asarray(prices, dtype=float), axis=-1)
+
+	# list of crop dicts, as read_crops_csv and load_chosen_crops return
+	def to_dicts(self):
+		return [{
+			"name": self.names[i],
+			"season": self.seasons[i],
+			"area type": self.area_types[i],
+			"input water type": self.input_water_types[i],
+			"water use (ML/ha)": self.water_use[i],
+			"yield (units/ha)": self.yields[i],
+			"price ($/unit)": self.prices[i],
+			"price med ($/unit)": self.price_med[i],
+			"cost ($/ha)": self.costs[i],
+			"Gross margin ($/ha)": self.gross_margin[i],
+		} for i in range(len(self))]
+
+# b of the LP, the water licences and the area of each irrigation type in each season, in the rows of lp_matrices
+def lp_rhs(farm_area, water_licence):
+	b = [water_licence[input_water] for input_water in input_waters]
+	for season in seasons:
+		b.extend(farm_area[area_type] for area_type in area_types)
+		b.append(farm_area["flood"]+farm_area["drip"]+farm_area["spray"]+farm_area["dryland"])
+	return np.array(b, dtype=float)
+
+# names of the rows of lp_matrices, e.g. "surface" and "Summer flood". "Summer total" is the row of all crops in the season
+def lp_rows():
+	rows = list(input_waters)
+	for season in seasons:
+		rows.extend(season + " " + area_type for area_type in area_types + ["total"])
+	return rows
+
+# units of each crop as a row, padded with zeros
+def _units(values):
+	values = [np.atleast_1d(np.asarray(v, dtype=float)) for v in values]
+	table = np.zeros((len(values), max([len(v) for v in values] + [1])))
+	for i, v in enumerate(values):
+		table[i, :len(v)] = v
+	return table
+
+# table of a list of crop dicts, fields missing from the dicts are given defaults
+def crop_table_from_dicts(crops):
+	if isinstance(crops, CropTable):
+		return crops
+	return CropTable(
+		names=[crop["name"] for crop in crops],
+		seasons=[crop["season"] for crop in crops],
+		area_types=[crop.get("area type", "dryland") for crop in crops],
+		input_water_types=[crop.get("input water type", "dryland") for crop in crops],
+		water_use=[crop["water use (ML/ha)"] for crop in crops],
+		yields=_units([crop["yield (units/ha)"] for crop in crops]),
+		prices=_units([crop["price ($/unit)"] for crop in crops]),
+		price_med=_units([crop.get("price med ($/unit)", crop["price ($/unit)"]) for crop in crops]),
+		costs=[crop["cost ($/ha)"] for crop in crops],
+		gross_margin=[crop.get("Gross margin ($/ha)", np.nan) for crop in crops],
+	)
+
+# valid crops of a crops csv, see read_crops_csv
+def read_crop_table(file_name):
+	names, crop_seasons, crop_area_types, water_use, yields, prices, price_med, costs, gross_margin = [], [], [], [], [], [], [], [], []
+	with open(file_name) as csvfile:
+		for row in csv.DictReader(csvfile):
+			if row['valid'] == 'TRUE':
+				try:
+					values = (float(row["water use (ML/ha)"]), json.loads(row['yield (units/ha)']), json.loads(row['price ($/unit)']),
+						json.loads(row['price med ($/unit)']), float(row['cost ($/ha)']), float(row["Gross margin ($/ha)"]))
+				except ValueError:
+					print "invalid crop", row
+					continue
+				names.append(row['name'])
+				crop_seasons.append(row['season'])
+				crop_area_types.append(row['area type'])
+				for column, value in zip([water_use, yields, prices, price_med, costs, gross_margin], values):
+					column.append(value)
+
+	return CropTable(names, crop_seasons, crop_area_types, [""]*len(names), water_use,
+		_units(yields), _units(prices), _units(price_med), costs, gross_margin)
+
+# crops of a catalog csv. Catalogs differ in their columns: headers and values are stripped of padding, area types
+# such as "flood_irrigation" are renamed (area_type_aliases), a missing season is found from the name (season_keywords),
+# a missing price med is the price, and a "... seed ..." row is the second unit of its "... lint ..." row.
+# With valid_only, rows whose valid column is not TRUE are left out
+def read_crop_catalog(file_name, valid_only=True):
+	crops = []
+	by_name = {}
+	with open(file_name) as csvfile:
+		reader = csv.reader(csvfile)
+		header = [column.strip() for column in next(reader)]
+		for values in reader:
+			row = dict(zip(header, [value.strip() for value in values]))
+			if not row.get('name') or (valid_only and row.get('valid', 'TRUE') != 'TRUE'):
+				continue
+			try:
+				crop = {
+					"name": row['name'],
+					"season": row.get('season') or catalog_season(row['name']),
+					"area type": area_type_aliases.get(row['area type'], row['area type']),
+					"water use (ML/ha)": float(row["water use (ML/ha)"]),
+					"yield (units/ha)": np.atleast_1d(json.loads(row['yield (units/ha)'])),
+					"price ($/unit)": np.atleast_1d(json.loads(row['price ($/unit)'])),
+					"cost ($/ha)": float(row['cost ($/ha)']),
+					"Gross margin ($/ha)": float(row.get("Gross margin ($/ha)") or np.nan),
+				}
+				crop["price med ($/unit)"] = np.atleast_1d(json.loads(row['price med ($/unit)'])) if row.get('price med ($/unit)') else crop["price ($/unit)"]
+			except ValueError:
+				print "invalid crop", row
+				continue
+
+			lint = by_name.get(crop["name"].replace(" seed", " lint"))
+			if " seed" in crop["name"] and lint is not None:
+				for field in ["yield (units/ha)", "price ($/unit)", "price med ($/unit)"]:
+					lint[field] = np.concatenate((lint[field], crop[field]))
+				lint["water use (ML/ha)"] += crop["water use (ML/ha)"]
+				lint["cost ($/ha)"] += crop["cost ($/ha)"]
+				continue
+			by_name[crop["name"]] = crop
+			crops.append(crop)
+
+	table = crop_table_from_dicts(crops)
+	return table.replace(input_water_types=np.array([""]*len(table)))
+
+# season of a crop from its name, or "" when no keyword matches
+def catalog_season(name):
+	words = name.split("(")[0].lower()
+	for keyword, season in season_keywords:
+		if keyword in words:
+			return season
+	return ""
+
+# one table of the crops of tables, units padded with zeros to the most units of any table
+def concatenate_tables(tables):
+	columns = {}
+	units = max([table.yields.shape[1] for table in tables] + [1])
+	for field in fields:
+		values = [getattr(table, field) for table in tables]
+		if field in ["yields", "prices", "price_med"]:
+			values = [np.pad(v, ((0, 0), (0, units - v.shape[1])), "constant") for v in values]
+		columns[field] = np.concatenate(values)
+	return CropTable(**columns)
+
+_tables = {}
+
+# read_crop_table (or read, e.g. read_crop_catalog), read again only when the file changes
+def load_crop_table(file_name, read=read_crop_table):
+	key = (os.path.abspath(file_name), os.path.getmtime(file_name), read)
+	if key not in _tables:
+		_tables[key] = read(file_name)
+	return _tables[key]
@@ -0,0 +1,85 @@
+import os
+import unittest
+import numpy as np
+
+from farm_decision.crop_table import CropTable, concatenate_tables, crop_table_from_dicts, load_crop_table, read_crop_catalog
+
+farm_dir = os.path.dirname(os.path.abspath(__file__))
+crops_csv = os.path.join(farm_dir, "chosen_crops.csv")
+
+crops = [
+    {"name": "COTTON", "season": "Summer", "area type": "flood", "water use (ML/ha)": 7., "yield (units/ha)": 9., "price ($/unit)": 500., "cost ($/ha)": 2600.},
+    {"name": "WHEAT", "season": "Winter", "area type": "dryland", "water use (ML/ha)": 0., "yield (units/ha)": 2., "price ($/unit)": 250., "cost ($/ha)": 370.},
+]
+
+
+class TestCropTable(unittest.TestCase):
+
+    def test_expand_by_WUE(self):
+        table = crop_table_from_dicts(crops).expand_by_WUE({"flood": 50., "spray": 80.})
+        self.assertEqual(list(table.names), ["COTTON"]*4 + ["WHEAT"])
+        self.assertEqual(list(table.area_types), ["flood", "flood", "spray", "spray", "dryland"])
+        self.assertEqual(list(table.input_water_types), ["surface", "ground", "surface", "ground", "dryland"])
+        self.assertTrue(np.allclose(table.water_use, [14., 14., 8.75, 8.75, 0.]))
+
+    def test_prices(self):
+        table = crop_table_from_dicts(crops).scale_price_med(0.5)
+        self.assertTrue(np.allclose(table.trended_prices("flat", 0, 10)[:, 0], [250., 125.]))
+        self.assertTrue(np.allclose(table.trended_prices("up", 9, 10)[:, 0], [300., 150.]))
+        self.assertTrue(np.allclose(table.with_prices(table.trended_prices("down", 4, 10)).revenue(), [9.*225., 2.*112.5]))
+
+    def test_lp_matrices(self):
+        table = crop_table_from_dicts(crops).expand_by_WUE({"flood": 100., "spray": 100.})
+        farm_area = {"flood": 100., "spray": 50., "drip": 0., "dryland": 10.}
+        C, A, b = table.lp_matrices(farm_area, {"surface": 300., "ground": 200.})
+        self.assertEqual(A.shape, (10, 5))
+        self.assertTrue(np.allclose(C, table.costs + table.water_costs() - table.revenue()))
+        self.assertTrue(np.allclose(A[0], [7., 0., 7., 0., 0.]))
+        self.assertTrue(np.allclose(b[:4], [300., 200., 100., 50.]))
+
+    def test_load(self):
+        table = load_crop_table(crops_csv)
+        self.assertTrue(load_crop_table(crops_csv) is table)
+        self.assertTrue(len(table) > 0)
+        self.assertEqual(table.yields.shape, (len(table), 1))
+
+    def test_lp_sparse(self):
+        table = concatenate_tables([crop_table_from_dicts(crops), read_crop_catalog(os.path.join(farm_dir, "rebecca_thesis_crops.csv"))])
+        table = table.expand_by_WUE({"flood": 60., "spray": 90.})
+        farm_area = {"flood": 100., "spray": 50., "drip": 0., "dryland": 10.}
+        C, A, b = table.lp_matrices(farm_area, {"surface": 300., "ground": 200.})
+        sparse_C, sparse_A, sparse_b = table.lp_sparse(farm_area, {"surface": 300., "ground": 200.})
+        self.assertTrue(np.array_equal(sparse_A.toarray(), A))
+        self.assertTrue(np.array_equal(sparse_C, C) and np.array_equal(sparse_b, b))
+
+
+class TestCropCatalog(unittest.TestCase):
+
+    def test_read_catalog(self):
+        table = read_crop_catalog(os.path.join(farm_dir, "rebecca_thesis_crops.csv"))
+        names = list(table.names)
+        # seed is the second unit of the lint
+        self.assertFalse("Irrigated cotton seed (wheat rotation)" in names)
+        cotton = table.take(names.index("Irrigated cotton lint (wheat rotation)"))
+        self.assertEqual(cotton.seasons, "Summer")
+        self.assertTrue(np.allclose(cotton.yields, [7.23, 2.52]) and np.allclose(cotton.prices, [498., 133.]))
+        self.assertEqual(table.seasons[names.index("Dryland winter wheat (irrig cotton rotation)")], "Winter")
+
+    def test_padded_catalog(self):
+        table = read_crop_catalog(os.path.join(farm_dir, "powell_crops.csv"), valid_only=False)
+        self.assertEqual(len(table), 13)
+        self.assertEqual(table.names[0], "Cotton (BT irrigated)")
+        self.assertEqual(set(table.area_types), set(["flood", "dryland"]))
+        self.assertEqual(table.gross_margin[list(table.names).index("Chickpea (dryland)")], 335.)
+
+    def test_concatenate(self):
+        dpi = read_crop_catalog(os.path.join(farm_dir, "dpi_budget_crops.csv"))
+        rebecca = read_crop_catalog(os.path.join(farm_dir, "rebecca_thesis_crops.csv"))
+        table = concatenate_tables([dpi, rebecca])
+        self.assertEqual(len(table), len(dpi) + len(rebecca))
+        self.assertEqual(table.yields.shape[1], 2)
+        self.assertTrue(np.allclose(table.revenue(), np.concatenate((dpi.revenue(), rebecca.revenue()))))
+
+
+if __name__ == '__main__':
+    unittest.main()
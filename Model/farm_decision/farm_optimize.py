@@ -13,48 +13,48 @@ from scipy.optimize import linprog
 import numpy as np
 import os
 from ConfigLoader import *
+from farm_decision.crop_table import concatenate_tables, crop_table_from_dicts, load_crop_table, lp_rhs, lp_rows, read_crop_catalog
+from farm_decision.crop_lp import crop_lp
 
 
 
 
-# maximise revenue subject to water and land area constraints
-def scipy_linprog_find_optimal_crops(crops, farm_area, water_licence):
-	water_cost = {
-		'surface': .8,  # $/ML
-		'ground' : 1.6,  # $/ML
-		'dryland': 0,
-	}
+# maximise revenue subject to water and land area constraints, crops is a CropTable or a list of crop dicts
+# solver "linprog" uses scipy.optimize.linprog, "basis" the warm started simplex of crop_lp which gives the same optimum,
+# and "sparse" builds a sparse A for large crop catalogs
+def scipy_linprog_find_optimal_crops(crops, farm_area, water_licence, solver="linprog"):
 
 	# ----objective function option 1-----: 
 	#C is cost ($/ha) for each crop (as opposed to profit as the optimisation runs on minimising)
-	C = [crop['cost ($/ha)'] + crop["water use (ML/ha)"] * water_cost[crop['input water type']] - (crop["yield (units/ha)"] * crop["price ($/unit)"]) for crop in crops]
-
 	# ----objective function option 2----: 
 	#C is gross margin ($/ha) plus water cost
 	# C = [crop["water use (ML/ha)"] * water_cost[crop['input water type']] - (crop["Gross margin ($/ha)"]) for crop in crops]
-	# constraints, A is water use (ML/ha) for each crop
-	A = []
-	b = []
-		# water use must be less than licence
-	for input_water in ['surface', 'ground']:
-		A.append([int(crop["input water type"]==input_water) * crop["water use (ML/ha)"] for crop in crops])
-		b.append(water_licence[input_water])
+	# constraints, A is water use (ML/ha) for each crop, and area of each season and irrigation type
+	if solver == "sparse":
+		C, A, b = crop_table_from_dicts(crops).lp_sparse(farm_area, water_licence)
+		return sparse_linprog(C, A, b)
+	#end if
 
-	# total area farmed each season must be less than farm area for each type of irrigation
-	for season in ["Summer", "Winter"]:
-		for area_type in ["flood", "spray", "drip"]:
-			A.append(map(int,[crop["season"] == season and crop["area type"] == area_type for crop in crops])) #T/F=1/0, summer flood crop etc.
-			b.append(farm_area[area_type])
-		# dryland crops may grow on any type
-		A.append(map(int,[crop["season"]==season for crop in crops])) #any crop in summer/winter
-		b.append(farm_area["flood"]+farm_area["drip"]+farm_area["spray"]+farm_area["dryland"]) 
+	C, A, b = crop_table_from_dicts(crops).lp_matrices(farm_area, water_licence)
 
+	if solver == "basis":
+		return crop_lp(A).solve(C, b)
+	elif solver != "linprog":
+		raise ValueError("Unknown LP solver: %s" % solver)
+	#end if
 
 	bounds = ((0,None),)*len(crops) #repeat (0,None) len(crops) (= 20) times, ie. each crop has (0,None)
 
 	res = linprog(C, A_ub=A, b_ub=b, bounds=bounds, options={"disp": False})
 	return res
 
+# linprog of a scipy.sparse A, with HiGHS where scipy has it and otherwise the sparse interior point method
+def sparse_linprog(C, A, b):
+	try:
+		return linprog(C, A_ub=A, b_ub=b, method="highs")
+	except ValueError:
+		return linprog(C, A_ub=A, b_ub=b, method="interior-point", options={"sparse": True, "disp": False})
+
 
 def read_crops_csv(file_name):
 	import csv
@@ -100,19 +100,39 @@ def print_results(res, crops):
 
 	# print res
 
-def maximum_profit(crops, farm_area, total_water_licence):
+profit_cache = None
 
-	water_cost = {
-		'surface': .8,  # $/ML
-		'ground' : 1.6,  # $/ML
-		'dryland': 0,
-	}
+# serve repeated optimisations from a profit_cache.ProfitCache, or None to always solve the LP
+def set_profit_cache(cache):
+	global profit_cache
+	profit_cache = cache
+
+# with sensitivity, also the dict of farm_sensitivity from the same solve, which needs solver "basis"
+def maximum_profit(crops, farm_area, total_water_licence, solver="linprog", sensitivity=False):
+
+	crops = crop_table_from_dicts(crops)
+
+	if profit_cache is None:
+		return solve_maximum_profit(crops, farm_area, total_water_licence, solver, sensitivity)
+
+	C, A, b = crops.lp_matrices(farm_area, total_water_licence)
+	key = profit_cache.key(C, A, b, solver, sensitivity)
+	profit = profit_cache.get(key)
+	if profit is None:
+		profit = solve_maximum_profit(crops, farm_area, total_water_licence, solver, sensitivity)
+		profit_cache.put(key, profit)
+	return profit
+
+def solve_maximum_profit(crops, farm_area, total_water_licence, solver, sensitivity=False):
 
-	res = scipy_linprog_find_optimal_crops(crops, farm_area, total_water_licence)
+	if sensitivity and solver != "basis":
+		raise ValueError("LP sensitivity needs the basis solver, not %s" % solver)
+
+	res = scipy_linprog_find_optimal_crops(crops, farm_area, total_water_licence, solver=solver)
 
 	# profit = sum([res.x[i] * (np.sum(crop["yield (units/ha)"] * crop["price ($/unit)"]) - crop['cost ($/ha)'] - crop["water use (ML/ha)"]*1.6) for i, crop in enumerate(crops)])
 
-	profit = sum([res.x[i] * (np.sum(crop["yield (units/ha)"] * crop["price ($/unit)"]) - crop['cost ($/ha)'] - crop["water use (ML/ha)"]*water_cost[crop['input water type']]) for i, crop in enumerate(crops)])
+	profit = np.dot(res.x, crops.profit())
 
 	# print "=========="
 	# for i, crop in enumerate(crops):
@@ -125,8 +145,46 @@ def maximum_profit(crops, farm_area, total_water_licence):
 	# water_use = sum([res.x[i] * crop["water use (ML/ha)"] for i,crop in enumerate(crops)])
 	# print "water_use", water_use
 
+	if sensitivity:
+		return profit, farm_sensitivity(crops, farm_area, total_water_licence, res)
 	return profit
 
+# marginal values and allowable ranges of the optimum res of the LP of crops, from its final basis:
+#   "shadow price": $ of profit for one more ML of each licence or ha of each season and area type, keyed by lp_rows
+#   "range": (lower, upper) of each licence and area over which the shadow prices hold
+#   "profit range": (lower, upper) arrays of the profit ($/ha) of each crop over which the crop areas stay optimal
+def farm_sensitivity(crops, farm_area, water_licence, res):
+	C, A, b = crops.lp_matrices(farm_area, water_licence)
+	rows = lp_rows()
+	lower, upper = res.rhs_ranges(b)
+	cost_lower, cost_upper = crop_lp(A).cost_ranges(res, C)
+	return {
+		"shadow price": dict(zip(rows, -res.y)),
+		"range": dict(zip(rows, zip(lower, upper))),
+		"profit range": (-cost_upper, -cost_lower),
+	}
+
+# maximum_profit of many instances of crops, for a sweep of price trajectories, water licences and farm areas.
+# prices is crops*units or instances*crops*units, water_licences and farm_areas a dict or a list of dicts for each instance.
+# Returns the profit of each instance and its crop areas (instances*crops, ha)
+def maximum_profit_batch(crops, prices, water_licences, farm_areas):
+
+	crops = crop_table_from_dicts(crops)
+
+	if isinstance(water_licences, dict):
+		water_licences = [water_licences]
+	if isinstance(farm_areas, dict):
+		farm_areas = [farm_areas]
+
+	C = np.atleast_2d(crops.lp_costs(prices))
+	b = np.array([lp_rhs(farm_area, water_licence) for farm_area, water_licence in zip(*np.broadcast_arrays(farm_areas, water_licences))])
+	instances = max(len(C), len(b))
+
+	A = crops.lp_matrices(farm_areas[0], water_licences[0])[1]
+	x, fun = crop_lp(A).solve_batch(np.broadcast_to(C, (instances, len(crops))), np.broadcast_to(b, (instances, len(A))))
+
+	return -fun, x
+
 # note farm_area = {'irrigated area': x, 'dryland area': y}, different to scipy_linprog_find_optimal_crops
 def lp_for_dp(crops, farm_area, water_licence):
 	# objective function
@@ -165,37 +223,13 @@ else:
 	farm_dir = os.path.dirname('__file__')+'/'
 
 def load_chosen_crops(WUE, crop_price_scale, WUE_scenarios=None): #WUE is....; crop_price_scale is a value e.g. 0.5 or 1 to adjust crop price
-# def load_chosen_crops(WUE):
-	crops = read_crops_csv(farm_dir+'chosen_crops.csv') 
-
-	# create a different crop for each type of irrigation
-	crops_expanded_by_WUE = []
-	for crop in crops:
-		crop["price med ($/unit)"] = crop_price_scale * crop["price med ($/unit)"]
-
-		if crop["water use (ML/ha)"] > 0:
-			for irrigation_type in ["flood", "spray"]:
-				local_copy = crop.copy()
-
-				if WUE_scenarios is not None:
-					local_copy["water use (ML/ha)"] = (WUE_scenarios[local_copy['area type']]['med']/ WUE[irrigation_type]) * local_copy["water use (ML/ha)"]
-				else:#run this if WUE_scenarios is not specified in load_chosen_crops()
-					local_copy["water use (ML/ha)"] = (100. / WUE[irrigation_type]) * local_copy["water use (ML/ha)"]
-				#End if
-				
-				local_copy["area type"] = irrigation_type
-				for input_water in ["surface", "ground"]:
-					input_water_copy = local_copy.copy()
-					input_water_copy["input water type"] = input_water
-
-					crops_expanded_by_WUE.append(input_water_copy)
-		else: 
-			local_copy = crop.copy()
-			local_copy["area type"] = "dryland"
-			local_copy["input water type"] = "dryland"
-			crops_expanded_by_WUE.append(local_copy)
-
-	return crops_expanded_by_WUE
+	return load_chosen_crop_table(WUE, crop_price_scale, WUE_scenarios).to_dicts()
+
+# chosen_crops.csv as a CropTable, with a different crop for each type of irrigation and input water.
+# The csv is only read again when it changes
+def load_chosen_crop_table(WUE, crop_price_scale, WUE_scenarios=None):
+	crops = load_crop_table(farm_dir+'chosen_crops.csv')
+	return crops.scale_price_med(crop_price_scale).expand_by_WUE(WUE, WUE_scenarios)
 
 def load_crops():
 	# http://www.dpi.nsw.gov.au/agriculture/farm-business/budgets/summer-crops
@@ -220,6 +254,15 @@ def load_crops():
 
 	return all_crops
 
+# the crop catalogs merged by load_crop_catalog
+crop_catalogs = ['dpi_budget_crops.csv', 'powell_crops.csv', 'rebecca_thesis_crops.csv']
+
+# one CropTable of the crops of catalog csvs (crop_catalogs in farm_dir by default), each read again only when it changes
+def load_crop_catalog(file_names=None):
+	if file_names is None:
+		file_names = [farm_dir+file_name for file_name in crop_catalogs]
+	return concatenate_tables([load_crop_table(file_name, read=read_crop_catalog) for file_name in file_names])
+
 def potential_load_crops():
 	return [{
 			'name': 'SEMI-IRRIGATED COTTON',
@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+
+from farm_decision.crop_lp_test import crops
+from farm_decision.farm_optimize import maximum_profit, maximum_profit_batch
+
+
+class TestMaximumProfitBatch(unittest.TestCase):
+
+    def setUp(self):
+        rs = np.random.RandomState(2)
+        years = 20
+        # down, flat and up price trajectories over years for a few licences
+        self.prices = np.array([crops.trended_prices(trend, year, years) for trend in ["down", "flat", "up"] for year in range(years)]*4)
+        self.water_licences = [{"surface": rs.uniform(0, 2000), "ground": rs.uniform(0, 3000)} for i in range(4) for j in range(3*years)]
+        self.farm_area = {"flood": 5000., "spray": 1000., "drip": 0., "dryland": 12.6}
+
+    def test_against_maximum_profit(self):
+        profits, areas = maximum_profit_batch(crops, self.prices, self.water_licences, self.farm_area)
+        self.assertEqual(areas.shape, (len(self.prices), len(crops)))
+        for i in range(0, len(self.prices), 7):
+            table = crops.with_prices(self.prices[i])
+            expected = maximum_profit(table, self.farm_area, self.water_licences[i], solver="basis")
+            self.assertAlmostEqual(profits[i], expected, delta=1e-6*abs(expected))
+            self.assertAlmostEqual(np.dot(areas[i], table.profit()), profits[i], delta=1e-6*abs(expected))
+
+    def test_repeated_instances(self):
+        # flat prices are the same every year
+        profits, areas = maximum_profit_batch(crops, crops.price_med, {"surface": 1400., "ground": 2200.}, [self.farm_area]*5)
+        self.assertEqual(len(profits), 5)
+        self.assertTrue(np.all(profits == profits[0]))
+        self.assertTrue(np.all(areas == areas[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+Content keyed cache of farm LP optima
+
+The farm LP only sees the crop table through C and A, and the farm area and water licences
+through b. With flat crop prices and constant allocations it is the same LP every year and in
+every scenario that differs only in eco parameters. An optimum is keyed by a hash of C, A, b
+and the solver, and kept in memory with least recently used eviction.
+"""
+import collections
+import hashlib
+import numpy as np
+
+
+class ProfitCache():
+
+	def __init__(self, maxsize=1024):
+		self.maxsize = maxsize
+		self.results = collections.OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	# hash of the LP of a crop table's lp_matrices, solved by solver, with or without the sensitivity of maximum_profit
+	def key(self, C, A, b, solver, sensitivity=False):
+		digest = hashlib.sha1(solver.encode())
+		if sensitivity:
+			digest.update(b"sensitivity")
+		for x in (C, A, b):
+			x = np.ascontiguousarray(x, dtype=float)
+			digest.update(("%s" % (x.shape,)).encode())
+			digest.update(x.tobytes())
+		return digest.hexdigest()
+
+	# maximum profit (and sensitivity) for key, or None
+	def get(self, key):
+		if key in self.results:
+			profit = self.results.pop(key)
+			self.results[key] = profit
+			self.hits += 1
+			return profit
+
+		self.misses += 1
+		return None
+
+	def put(self, key, profit):
+		self.results[key] = profit
+		while len(self.results) > self.maxsize:
+			self.results.popitem(last=False)
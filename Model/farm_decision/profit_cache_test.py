@@ -0,0 +1,49 @@
+import unittest
+
+from farm_decision import farm_optimize
+from farm_decision.crop_lp_test import crops
+from farm_decision.crop_table import crop_table_from_dicts
+from farm_decision.profit_cache import ProfitCache
+
+farm_area = {"flood": 5000., "spray": 1000., "drip": 0., "dryland": 12.6}
+water_licence = {"surface": 1400., "ground": 2200.}
+
+
+class TestProfitCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ProfitCache(maxsize=2)
+        farm_optimize.set_profit_cache(self.cache)
+
+    def tearDown(self):
+        farm_optimize.set_profit_cache(None)
+
+    def test_key(self):
+        C, A, b = crops.lp_matrices(farm_area, water_licence)
+        key = self.cache.key(C, A, b, "basis")
+        self.assertEqual(key, self.cache.key(C.copy(), A.copy(), b.copy(), "basis"))
+        self.assertNotEqual(key, self.cache.key(C, A, b*1.01, "basis"))
+        self.assertNotEqual(key, self.cache.key(C, A, b, "linprog"))
+        # the table as crop dicts is the same LP
+        self.assertEqual(key, self.cache.key(*crop_table_from_dicts(crops.to_dicts()).lp_matrices(farm_area, water_licence) + ("basis",)))
+
+    def test_maximum_profit(self):
+        profit = farm_optimize.maximum_profit(crops, farm_area, water_licence, solver="basis")
+        self.assertEqual(farm_optimize.maximum_profit(crops.to_dicts(), dict(farm_area), dict(water_licence), solver="basis"), profit)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        farm_optimize.set_profit_cache(None)
+        self.assertAlmostEqual(farm_optimize.maximum_profit(crops, farm_area, water_licence, solver="basis"), profit)
+
+    def test_lru(self):
+        self.cache.put("a", 1.)
+        self.cache.put("b", 2.)
+        self.cache.get("a")
+        self.cache.put("c", 3.)
+        self.assertEqual(self.cache.get("a"), 1.)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
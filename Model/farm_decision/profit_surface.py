@@ -0,0 +1,96 @@
+"""
+Maximum farm profit as a function of the surface and ground water allocations
+
+For a crop table and farm area the LP of maximum_profit only changes through the two water
+licences (the first two rows of b). By LP duality the maximum profit is concave and piecewise
+linear in them: the minimum of the planes -y.b given by the dual solutions y of the pieces.
+ProfitSurface collects those planes by solving the LP at the corners of the allocation box and
+then at every vertex of the current lower envelope, until the LP agrees with the envelope at
+all of them. The envelope is then exact over the box, and profits are a vectorized minimum over
+a handful of planes rather than an LP solve.
+"""
+import numpy as np
+
+from farm_decision.crop_lp import crop_lp
+from farm_decision.crop_table import crop_table_from_dicts
+
+
+class ProfitSurface():
+
+	# exact for surface allocations in [0, max_surface] and ground allocations in [0, max_ground] (ML)
+	def __init__(self, crops, farm_area, max_surface, max_ground, tol=1e-7, max_rounds=100):
+		self.crops = crop_table_from_dicts(crops)
+		self.max_surface = float(max_surface)
+		self.max_ground = float(max_ground)
+
+		self.C, self.A, self.b = self.crops.lp_matrices(farm_area, {"surface": 0., "ground": 0.})
+		self.solver = crop_lp(self.A)
+		self.scale = tol*(1. + np.abs(self.C).max()*(self.max_surface + self.max_ground + np.abs(self.b).sum()))
+
+		# rows of (surface coefficient, ground coefficient, constant)
+		self.planes = np.empty((0, 3))
+		self.solves = 0
+
+		checked = set()
+		points = [(0., 0.), (self.max_surface, 0.), (0., self.max_ground), (self.max_surface, self.max_ground)]
+		for rounds in range(max_rounds):
+			added = False
+			for point in points:
+				key = (round(point[0], 6), round(point[1], 6))
+				if key in checked:
+					continue
+				checked.add(key)
+				added = self._check(point[0], point[1]) or added
+			if not added:
+				break
+			points = self.vertices()
+		else:
+			raise RuntimeError("profit surface did not converge in %d rounds" % max_rounds)
+
+	def _check(self, surface, ground):
+		b = self.b.copy()
+		b[:2] = surface, ground
+		res = self.solver.solve(self.C, b)
+		self.solves += 1
+		profit = -res.fun
+
+		if len(self.planes) > 0 and self(surface, ground) <= profit + self.scale:
+			return False
+
+		plane = np.array([-res.y[0], -res.y[1], -res.y[2:].dot(b[2:])])
+		self.planes = np.vstack((self.planes, plane))
+		return True
+
+	# maximum profit ($) at surface and ground allocations (ML), which may be arrays
+	def __call__(self, surface, ground):
+		surface, ground = np.broadcast_arrays(np.asarray(surface, dtype=float), np.asarray(ground, dtype=float))
+		values = self.planes[:, 0]*surface[..., None] + self.planes[:, 1]*ground[..., None] + self.planes[:, 2]
+		return values.min(axis=-1)
+
+	# vertices of the pieces of the envelope within the box: points where planes and box edges meet, three at a time
+	def vertices(self):
+		# lines p*surface + q*ground = r, where two planes are equal and the box edges
+		i, j = np.triu_indices(len(self.planes), 1)
+		d = self.planes[i] - self.planes[j]
+		lines = np.vstack((
+			np.column_stack((d[:, 0], d[:, 1], -d[:, 2])),
+			[[1., 0., 0.], [1., 0., self.max_surface], [0., 1., 0.], [0., 1., self.max_ground]]))
+
+		k, l = np.triu_indices(len(lines), 1)
+		det = lines[k, 0]*lines[l, 1] - lines[k, 1]*lines[l, 0]
+		ok = np.abs(det) > 1e-12
+		k, l, det = k[ok], l[ok], det[ok]
+		surface = (lines[k, 2]*lines[l, 1] - lines[k, 1]*lines[l, 2])/det
+		ground = (lines[k, 0]*lines[l, 2] - lines[k, 2]*lines[l, 0])/det
+
+		eps = 1e-9*(1. + self.max_surface + self.max_ground)
+		inside = (surface > -eps) & (surface < self.max_surface + eps) & (ground > -eps) & (ground < self.max_ground + eps)
+		surface = np.clip(surface[inside], 0., self.max_surface)
+		ground = np.clip(ground[inside], 0., self.max_ground)
+
+		values = self.planes[:, 0]*surface[:, None] + self.planes[:, 1]*ground[:, None] + self.planes[:, 2]
+		active = np.sum(values <= values.min(axis=1)[:, None] + self.scale, axis=1)
+		edges = (np.abs(surface) < eps).astype(int) + (np.abs(surface - self.max_surface) < eps) + (np.abs(ground) < eps) + (np.abs(ground - self.max_ground) < eps)
+		vertex = active + edges >= 3
+
+		return list(zip(surface[vertex], ground[vertex]))
@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+
+from farm_decision.crop_table import crop_table_from_dicts
+from farm_decision.farm_optimize import maximum_profit
+from farm_decision.profit_surface import ProfitSurface
+
+rs = np.random.RandomState(4)
+crops = crop_table_from_dicts([
+    {"name": "crop %d" % i, "season": ["Summer", "Winter"][i % 2], "area type": ["flood", "spray"][i//2 % 2],
+     "water use (ML/ha)": rs.uniform(1., 8.), "yield (units/ha)": rs.uniform(2., 10.), "price ($/unit)": rs.uniform(200., 500.),
+     "cost ($/ha)": rs.uniform(300., 2000.)} for i in range(12)
+]).expand_by_WUE({"flood": 60., "spray": 85.})
+farm_area = {"flood": 600., "spray": 250., "drip": 0., "dryland": 50.}
+
+
+class TestProfitSurface(unittest.TestCase):
+
+    def test_against_lp(self):
+        surface = ProfitSurface(crops, farm_area, 3000., 4000.)
+        self.assertTrue(len(surface.planes) > 2)
+
+        S = np.append(rs.uniform(0., 3000., 200), [0., 3000., 1500.])
+        G = np.append(rs.uniform(0., 4000., 200), [4000., 0., 0.])
+        profits = surface(S, G)
+        self.assertEqual(profits.shape, S.shape)
+        for s, g, profit in zip(S, G, profits):
+            expected = maximum_profit(crops, farm_area, {"surface": s, "ground": g}, solver="basis")
+            self.assertAlmostEqual(profit, expected, delta=1e-6*abs(expected) + 1e-6)
+
+    def test_no_water(self):
+        surface = ProfitSurface(crops, farm_area, 100., 100.)
+        self.assertAlmostEqual(surface(0., 0.), maximum_profit(crops, farm_area, {"surface": 0., "ground": 0.}, solver="basis"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Multi-year farm LP with crop rotations
+
+maximum_profit solves each year on its own, so a crop that must follow another (cotton after
+wheat, cotton after faba bean, see rebecca_thesis_crops.csv and the activities in
+dynamic_programming.py) can't be represented. Here the whole horizon is one LP: the single year
+LP of every year as a block of a sparse block diagonal A, with rows coupling consecutive years.
+A rotation (crops, preceding crops) keeps the area of crops in a year within the area of the
+preceding crops the year before.
+"""
+import numpy as np
+import scipy.sparse
+
+from farm_decision.crop_lp import crop_lp
+from farm_decision.crop_table import crop_table_from_dicts, lp_rhs
+from farm_decision.farm_optimize import sparse_linprog
+
+
+# rotations of rebecca_thesis_crops.csv, (crops, preceding crops) by name
+rebecca_rotations = [
+	(["Irrigated cotton lint (wheat rotation)"], ["Dryland winter wheat (irrig cotton rotation)"]),
+	(["Dryland winter wheat (irrig cotton rotation)"], ["Irrigated cotton lint (wheat rotation)"]),
+	(["Irrigated cotton lint (faba bean rotation)"], ["Faba bean"]),
+	(["Faba bean"], ["Irrigated cotton lint (faba bean rotation)"]),
+	(["Dryland cotton lint (wheat rotation)"], ["Dryland winter wheat"]),
+]
+
+# a dict for each of years from a dict or a list of dicts
+def _by_year(values, years):
+	if isinstance(values, dict):
+		return [values]*years
+	assert len(values) == years, "one value for each year"
+	return list(values)
+
+# C, A (scipy.sparse.csr_matrix) and b of the LP of years years of crops, x is the area of each crop in each year (years*crops, flattened).
+# farm_areas and water_licences are a dict or a dict for each year, prices are crops*units or years*crops*units (the table's
+# prices by default). initial_areas is the area (ha) of crops by name the year before the first; without it the first year
+# is not constrained by the rotations. Profits of year t are discounted by (1+discount_rate)^t
+def rotation_lp_matrices(crops, years, farm_areas, water_licences, prices=None, rotations=(), initial_areas=None, discount_rate=0.):
+	crops = crop_table_from_dicts(crops)
+	n = len(crops)
+
+	C = np.broadcast_to(crops.lp_costs(prices), (years, n))*(1. + discount_rate)**-np.arange(years)[:, None]
+	farm_areas = _by_year(farm_areas, years)
+	water_licences = _by_year(water_licences, years)
+
+	# the LP of each year, A is the same every year
+	A_year = crops.lp_sparse(farm_areas[0], water_licences[0])[1]
+	blocks = [scipy.sparse.block_diag([A_year]*years, format="csr")]
+	b = [lp_rhs(farm_area, water_licence) for farm_area, water_licence in zip(farm_areas, water_licences)]
+
+	# area of the crops in a year - area of the preceding crops the year before <= 0
+	rows, columns, values = [], [], []
+	rotation_b = []
+	for names, preceding in rotations:
+		following = np.flatnonzero(np.in1d(crops.names, names))
+		before = np.flatnonzero(np.in1d(crops.names, preceding))
+		first_year = 0 if initial_areas is not None else 1
+		for year in range(first_year, years):
+			row = len(rotation_b)
+			rows.extend([row]*len(following))
+			columns.extend(year*n + following)
+			values.extend([1.]*len(following))
+			if year == 0:
+				rotation_b.append(sum(initial_areas.get(name, 0.) for name in preceding))
+			else:
+				rows.extend([row]*len(before))
+				columns.extend((year - 1)*n + before)
+				values.extend([-1.]*len(before))
+				rotation_b.append(0.)
+	blocks.append(scipy.sparse.csr_matrix((values, (rows, columns)), shape=(len(rotation_b), years*n)))
+	b.append(rotation_b)
+
+	return C.ravel(), scipy.sparse.vstack(blocks, format="csr"), np.concatenate(b)
+
+# maximise the (discounted) profit of years years of crops subject to the rotations, in one solve, see rotation_lp_matrices.
+# solver "sparse" solves the sparse LP with sparse_linprog, "basis" with the simplex of crop_lp.
+# Returns the profit ($) of each year (undiscounted) and the area (ha) of each crop in each year (years*crops)
+def maximum_profit_rotation(crops, years, farm_areas, water_licences, prices=None, rotations=(), initial_areas=None, discount_rate=0., solver="sparse"):
+	crops = crop_table_from_dicts(crops)
+
+	C, A, b = rotation_lp_matrices(crops, years, farm_areas, water_licences, prices, rotations, initial_areas, discount_rate)
+
+	if solver == "sparse":
+		res = sparse_linprog(C, A, b)
+	elif solver == "basis":
+		res = crop_lp(A.toarray()).solve(C, b)
+	else:
+		raise ValueError("Unknown LP solver: %s" % solver)
+	#end if
+	if not res.success:
+		raise RuntimeError("rotation LP failed: status %d" % res.status)
+
+	areas = np.maximum(res.x.reshape(years, len(crops)), 0.)
+	profit = -np.broadcast_to(crops.lp_costs(prices), areas.shape)
+	return np.sum(areas*profit, axis=1), areas
@@ -0,0 +1,52 @@
+import os
+import unittest
+import numpy as np
+
+from farm_decision.crop_table import read_crop_catalog
+from farm_decision.farm_optimize import maximum_profit
+from farm_decision.rotation_lp import maximum_profit_rotation, rebecca_rotations, rotation_lp_matrices
+
+crops = read_crop_catalog(os.path.join(os.path.dirname(os.path.abspath(__file__)), "rebecca_thesis_crops.csv")).expand_by_WUE({"flood": 65., "spray": 80.})
+farm_area = {"flood": 500., "spray": 100., "drip": 0., "dryland": 200.}
+years = 6
+rs = np.random.RandomState(5)
+water_licences = [{"surface": rs.uniform(0, 3000), "ground": rs.uniform(0, 2000)} for year in range(years)]
+prices = np.array([crops.trended_prices("up", year, years) for year in range(years)])
+
+
+class TestRotationLP(unittest.TestCase):
+
+    def test_independent_years(self):
+        # without rotations the years are separate LPs
+        profits, areas = maximum_profit_rotation(crops, years, farm_area, water_licences, prices, solver="basis")
+        for year in range(years):
+            expected = maximum_profit(crops.with_prices(prices[year]), farm_area, water_licences[year], solver="basis")
+            self.assertAlmostEqual(profits[year], expected, delta=1e-6*abs(expected))
+
+    def test_rotations(self):
+        profits, areas = maximum_profit_rotation(crops, years, farm_area, water_licences, prices, rotations=rebecca_rotations, solver="basis")
+        names = crops.names
+        for following, preceding in rebecca_rotations:
+            area = areas[:, np.in1d(names, following)].sum(axis=1)
+            area_before = areas[:, np.in1d(names, preceding)].sum(axis=1)
+            self.assertTrue(np.all(area[1:] <= area_before[:-1] + 1e-6))
+
+        independent, independent_areas = maximum_profit_rotation(crops, years, farm_area, water_licences, prices, solver="basis")
+        self.assertTrue(profits.sum() <= independent.sum() + 1e-6)
+
+        sparse_profits, sparse_areas = maximum_profit_rotation(crops, years, farm_area, water_licences, prices, rotations=rebecca_rotations)
+        self.assertAlmostEqual(sparse_profits.sum(), profits.sum(), delta=1e-6*abs(profits.sum()))
+
+    def test_initial_areas(self):
+        C, A, b = rotation_lp_matrices(crops, years, farm_area, water_licences, rotations=rebecca_rotations)
+        C_initial, A_initial, b_initial = rotation_lp_matrices(crops, years, farm_area, water_licences, rotations=rebecca_rotations, initial_areas={"Faba bean": 50.})
+        self.assertEqual(A.shape, (years*10 + (years - 1)*len(rebecca_rotations), years*len(crops)))
+        self.assertEqual(A_initial.shape[0], A.shape[0] + len(rebecca_rotations))
+
+        profits, areas = maximum_profit_rotation(crops, years, farm_area, water_licences, rotations=rebecca_rotations, initial_areas={"Faba bean": 50.}, solver="basis")
+        self.assertTrue(areas[0, crops.names == "Irrigated cotton lint (faba bean rotation)"].sum() <= 50. + 1e-6)
+        self.assertTrue(areas[0, crops.names == "Irrigated cotton lint (wheat rotation)"].sum() <= 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
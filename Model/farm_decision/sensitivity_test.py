@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+
+from farm_decision.crop_lp import crop_lp
+from farm_decision.crop_lp_test import crops
+from farm_decision.farm_optimize import maximum_profit, scipy_linprog_find_optimal_crops
+
+farm_area = {"flood": 5000., "spray": 1000., "drip": 0., "dryland": 12.6}
+
+
+class TestSensitivity(unittest.TestCase):
+
+    def profit(self, water_licence, table=crops):
+        return maximum_profit(table, farm_area, water_licence, solver="basis")
+
+    def test_shadow_prices(self):
+        rs = np.random.RandomState(3)
+        for k in range(20):
+            water_licence = {"surface": rs.uniform(0, 5000), "ground": rs.uniform(0, 5000)}
+            profit, sensitivity = maximum_profit(crops, farm_area, water_licence, solver="basis", sensitivity=True)
+            self.assertAlmostEqual(profit, self.profit(water_licence))
+
+            for water in ["surface", "ground"]:
+                value = sensitivity["shadow price"][water]
+                lower, upper = sensitivity["range"][water]
+                self.assertTrue(value >= 0)
+                self.assertTrue(lower <= water_licence[water] <= upper)
+                # profit is linear in the licence, with slope the shadow price, over the range
+                for licence in [max(lower, 0.), min(upper, water_licence[water] + 1000.)]:
+                    changed = dict(water_licence)
+                    changed[water] = licence
+                    self.assertAlmostEqual(self.profit(changed), profit + value*(licence - water_licence[water]), delta=1e-6*abs(profit))
+
+    def test_profit_ranges(self):
+        water_licence = {"surface": 1400., "ground": 2200.}
+        profit, sensitivity = maximum_profit(crops, farm_area, water_licence, solver="basis", sensitivity=True)
+        x = scipy_linprog_find_optimal_crops(crops, farm_area, water_licence, solver="basis").x
+        lower, upper = sensitivity["profit range"]
+        crop_profit = crops.profit()
+        self.assertTrue(np.all(lower <= crop_profit + 1e-9) and np.all(crop_profit <= upper + 1e-9))
+
+        # crop areas don't change within the range of a crop's profit
+        for i in range(len(crops)):
+            for bound in [lower[i], upper[i]]:
+                if not np.isfinite(bound):
+                    continue
+                costs = crops.costs.copy()
+                costs[i] -= 0.99*(bound - crop_profit[i])
+                C, A, b = crops.replace(costs=costs).lp_matrices(farm_area, water_licence)
+                self.assertTrue(np.allclose(crop_lp(A).solve(C, b).x, x, atol=1e-6))
+
+    def test_needs_basis_solver(self):
+        self.assertRaises(ValueError, maximum_profit, crops, farm_area, {"surface": 1., "ground": 1.}, sensitivity=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
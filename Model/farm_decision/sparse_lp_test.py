@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+
+from farm_decision.crop_lp import crop_lp
+from farm_decision.crop_table import concatenate_tables
+from farm_decision.farm_optimize import load_crop_catalog, maximum_profit, scipy_linprog_find_optimal_crops
+from farm_decision.crop_table_test import farm_dir
+
+catalogs = [farm_dir + "/" + file_name for file_name in ["dpi_budget_crops.csv", "powell_crops.csv", "rebecca_thesis_crops.csv"]]
+farm_area = {"flood": 5000., "spray": 1000., "drip": 0., "dryland": 12.6}
+water_licence = {"surface": 1400., "ground": 2200.}
+
+
+class TestSparseLP(unittest.TestCase):
+
+    def test_catalog(self):
+        crops = load_crop_catalog(catalogs).expand_by_WUE({"flood": 65., "spray": 80.})
+        profit = maximum_profit(crops, farm_area, water_licence, solver="sparse")
+        self.assertAlmostEqual(profit, maximum_profit(crops, farm_area, water_licence, solver="basis"), delta=1e-6*abs(profit))
+
+    def test_large_catalog(self):
+        # thousands of activities, the catalog with perturbed yields and costs
+        crops = load_crop_catalog(catalogs).expand_by_WUE({"flood": 65., "spray": 80.})
+        rs = np.random.RandomState(4)
+        crops = concatenate_tables([crops]*100)
+        crops = crops.replace(yields=crops.yields*rs.uniform(0.8, 1.2, crops.yields.shape), costs=crops.costs*rs.uniform(0.8, 1.2, len(crops)))
+
+        res = scipy_linprog_find_optimal_crops(crops, farm_area, water_licence, solver="sparse")
+        self.assertTrue(res.success)
+        C, A, b = crops.lp_matrices(farm_area, water_licence)
+        self.assertTrue(np.all(A.dot(res.x) <= b + 1e-4))
+        self.assertAlmostEqual(res.fun, crop_lp(A).solve(C, b).fun, delta=1e-6*abs(res.fun))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,51 +4,50 @@ Python wrapper for Rachel Blaker's IhacresGW hydrological model of Maules Creek
 Michael Asher michael.james.asher@gmail.com
 February 2015
 """
-from rpy2.robjects import FloatVector
-from rpy2.robjects.packages import SignatureTranslatedAnonymousPackage
+try:
+	from rpy2.robjects import FloatVector, StrVector
+	from rpy2.robjects.packages import SignatureTranslatedAnonymousPackage
+except ImportError:
+	# rpy2 is only needed by the R engine, engine="numpy" runs without an R runtime
+	FloatVector = StrVector = SignatureTranslatedAnonymousPackage = None
 import os
 # import pandas
 import csv
 import numpy as np
 
 import datetime
-import itertools
 
 from ConfigLoader import *
 
+from hydrological import ihacres_gw, ensemble
+from climate.date_index import calendar_index
+
 def dateifier(date_string):
 	return datetime.datetime.strptime(date_string, "%Y-%m-%d")
 
+# reductions which have a ufunc are done with ufunc.reduceat over the year boundaries
+year_reductions = {np.sum: np.add, np.min: np.minimum, np.max: np.maximum}
+
 def f_by_year(date_strings, data, f):
-	dates = map(dateifier, date_strings)
-	assert len(data) == len(dates)
-	groups = []
-	uniquekeys = []
-	for k, g in itertools.groupby(range(len(data)), lambda i: dates[i].year):
-		the_list = list(g)
-		# groups.append( reduce(lambda x, i: x+data[i], the_list, 0.) )
-		groups.append( f([data[i] for i in the_list]) )
-		# groups.append(list(g)) # Store group iterator as a list
-		uniquekeys.append(k)
+	index = calendar_index(date_strings)
+	if f in year_reductions:
+		groups = list(index.reduce_by_year(data, year_reductions[f]))
+	else:
+		groups = index.apply_by_year(data, f)
 
-	return groups, uniquekeys
+	return groups, list(index.year_list)
 
 
 
 # print f_by_year(['1899-01-01', '1899-01-02', '1899-03-01', '1899-11-01', '1901-01-01', '1901-02-01'], [1,2,3,4,5,6], np.sum)
 
 def get_year_indices(date_strings):
-	dates = map(dateifier, date_strings)
-	groups = []
-	uniquekeys = []
-	for k, g in itertools.groupby(range(len(dates)), lambda i: dates[i].year):
-		the_list = list(g)
-		groups.append({"start":min(the_list), "end": max(the_list)+1})
-		uniquekeys.append(k)
-	return groups, uniquekeys
+	index = calendar_index(date_strings)
+	return index.year_indices(), list(index.year_list)
 	
 
-def run_hydrology(init_gwstorage, init_C, init_Nash, init_Qq, init_Qs, climate_type):
+# import WrappableRunIhacresGw.R as an R package, returns the package and the model's working and data directories
+def load_ihacres_package():
 
 	if "hydrological" in CONFIG.paths:
 		path = CONFIG.paths['hydrological']
@@ -74,18 +73,77 @@ def run_hydrology(init_gwstorage, init_C, init_Nash, init_Qq, init_Qs, climate_t
 		datadir = workingdir + "data"
 		workingdir = workingdir[:-1] #Remove last slash as function below expects it to be empty
 
-		# sim, tdat = IhacresGW.RunIhacresGw(workingdir, datadir)
-		return IhacresGW.RunIhacresGw(workingdir, datadir, init_gwstorage, init_C, FloatVector(init_Nash), init_Qq, init_Qs, climate_type)
+		return IhacresGW, workingdir, datadir
+
+def run_hydrology(init_gwstorage, init_C, init_Nash, init_Qq, init_Qs, climate_type):
+
+	IhacresGW, workingdir, datadir = load_ihacres_package()
+
+	# sim, tdat = IhacresGW.RunIhacresGw(workingdir, datadir)
+	return IhacresGW.RunIhacresGw(workingdir, datadir, init_gwstorage, init_C, FloatVector(init_Nash), init_Qq, init_Qs, climate_type)
+
+# as run_hydrology, but the climate and extraction timeseries are handed to R as vectors instead of through the csv files in data/
+# nothing is written to disk, so several scenarios can run at once
+def run_hydrology_from_data(dates, rainfall, PET, sw_extractions, gw_extractions, init_gwstorage, init_C, init_Nash, init_Qq, init_Qs, climate_type):
+
+	IhacresGW, workingdir, datadir = load_ihacres_package()
+
+	# extractions from generate_extractions are strings
+	to_vector = lambda x: FloatVector(np.asarray(x, dtype=float))
+
+	return IhacresGW.RunIhacresGwFromData(workingdir, datadir, StrVector(list(dates)), to_vector(rainfall), to_vector(PET), to_vector(sw_extractions), to_vector(gw_extractions), 
+		init_gwstorage, init_C, FloatVector(init_Nash), init_Qq, init_Qs, climate_type)
+
+# a long-lived R hydrology session. The R package is built, SetupIhacres run (libraries loaded, model sourced and byte compiled) 
+# and the parameter files parsed once, so each run only pays for the simulation itself
+class HydrologySession():
+
+	def __init__(self):
+		self.IhacresGW, self.workingdir, self.datadir = load_ihacres_package()
+		self.param = self.IhacresGW.SetupIhacresSession(self.workingdir, self.datadir)
+
+	# same arguments and return value as run_hydrology_from_data
+	# or with outputs, a list of names, a dict of only those outputs (see SelectIhacresOutputs in WrappableRunIhacresGw.R)
+	def run(self, dates, rainfall, PET, sw_extractions, gw_extractions, init_gwstorage, init_C, init_Nash, init_Qq, init_Qs, climate_type, outputs=None):
+
+		to_vector = lambda x: FloatVector(np.asarray(x, dtype=float))
+
+		if outputs is None:
+			return self.IhacresGW.RunIhacresGwSession(self.param, StrVector(list(dates)), to_vector(rainfall), to_vector(PET), to_vector(sw_extractions), to_vector(gw_extractions), 
+				init_gwstorage, init_C, FloatVector(init_Nash), init_Qq, init_Qs, climate_type)
+
+		selected = self.IhacresGW.RunIhacresGwSession(self.param, StrVector(list(dates)), to_vector(rainfall), to_vector(PET), to_vector(sw_extractions), to_vector(gw_extractions), 
+			init_gwstorage, init_C, FloatVector(init_Nash), init_Qq, init_Qs, climate_type, outputs=StrVector(outputs))
+		return r_outputs(selected, outputs)
+
+# outputs selected in R as numpy arrays, which view the R vectors rather than copy them
+def r_outputs(selected, outputs):
+	result = {}
+	for name in outputs:
+		if name == "state":
+			gwstorage, C, Nash, Qq, Qs = [np.asarray(x) for x in selected.rx2(name)]
+			result[name] = (gwstorage[0], C[0], Nash, Qq[0], Qs[0])
+		else:
+			result[name] = np.asarray(selected.rx2(name))
+	return result
+
+hydrology_session = None
+
+# the session shared by every run in this process, started on first use
+def get_hydrology_session():
+	global hydrology_session
+	if hydrology_session is None:
+		hydrology_session = HydrologySession()
+	return hydrology_session
 
 # creates daily timeseries from annual limits
 # daily extraction = annual limits/365: 1) the same every day and every year (although have the capacity to differentiate by year); 2) only controlled by annual limits, ie not depending on climate
 def generate_extractions(climate_dates, sw_limit, gw_limit):
 	sw_extractions = np.empty_like(climate_dates) #make it string?
 	gw_extractions = np.empty_like(climate_dates)
-	year_indices, year_list = get_year_indices(climate_dates)
-	for indices in year_indices:
-		sw_extractions[indices["start"]:indices["end"]] = sw_limit
-		gw_extractions[indices["start"]:indices["end"]] = gw_limit
+	# the same daily limit in every year
+	sw_extractions[:] = sw_limit
+	gw_extractions[:] = gw_limit
 	return sw_extractions, gw_extractions
 
 
@@ -175,25 +233,93 @@ def set_climate_data(dates, rainfall, PET, swextraction, gwextraction):
 
 
 
-def run_hydrology_by_year(year, init_state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type):
+hydrology_cache = None
+
+# serve repeated runs from a hydrology_cache.HydrologyCache, or None to always run the model
+def set_hydrology_cache(cache):
+	global hydrology_cache
+	hydrology_cache = cache
+
+# run the hydrological model over climate_dates[start:end]
+# engine is "R" to run the R code through rpy2, or "numpy" for the port in ihacres_gw.py
+def run_hydrology_by_period(start, end, init_state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine="R"):
+
+	if hydrology_cache is None:
+		return simulate_period(start, end, init_state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine)
+
+	key = hydrology_cache.key(climate_dates[start:end], rainfall[start:end], PET[start:end], sw_extractions[start:end], gw_extractions[start:end], 
+		climate_type, list(init_state), engine)
+	result = hydrology_cache.get(key)
+	if result is None:
+		result = simulate_period(start, end, init_state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine)
+		hydrology_cache.put(key, result)
+	return result
+
+def simulate_period(start, end, init_state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine):
+
+	# only the series used here are taken from the model, and the state so model can be stopped and started
+	outputs = ["state", "flow", "gwlevel", "gwstorage"]
+
+	if engine == "numpy":
+		param = ihacres_gw.read_param()
+		selected = ihacres_gw.ihacres_gw(param, rainfall[start:end], PET[start:end], sw_extractions[start:end], gw_extractions[start:end], *init_state, climate_type=climate_type, outputs=outputs)
+	elif engine == "R":
+		# pick the daily climate data (dates, rainfall, temp (pet), swextraction, gwextraction) within the period.
+		selected = get_hydrology_session().run(climate_dates[start:end], rainfall[start:end], PET[start:end], sw_extractions[start:end], gw_extractions[start:end], *init_state, climate_type=climate_type, outputs=outputs)
+	else:
+		raise ValueError("Unknown hydrology engine: %s" % engine)
+
+	return tuple(selected[name] for name in outputs)
+
+def run_hydrology_by_year(year, init_state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine="R"):
 
 	year_indices, year_list = get_year_indices(climate_dates)
 	indices = year_indices[year]
 	
-	# for each year, pick the daily climate data (dates, rainfall, temp (pet), swextraction, gwextraction) within that year.
-	set_climate_data(dates=climate_dates[indices["start"]:indices["end"]], rainfall=rainfall[indices["start"]:indices["end"]], PET=PET[indices["start"]:indices["end"]], swextraction=sw_extractions[indices["start"]:indices["end"]], gwextraction=gw_extractions[indices["start"]:indices["end"]])
+	# for each year, pick the daily climate data within that year.
+	return run_hydrology_by_period(indices["start"], indices["end"], init_state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine=engine)
 
-	hydro_sim, hydro_tdat, hydro_mod = run_hydrology(*init_state, climate_type=climate_type)
+# run the first `years` years in one go, rather than stopping and starting the model each year
+def run_hydrology_by_years(years, init_state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine="R"):
 
-	# get state so model can be stopped and started
-	state = get_state(hydro_sim, hydro_tdat, hydro_mod, indices["end"]-indices["start"])
-	
-	# extract data from hydrological model output
-	dates, flow, gwlevel, gwstorage, gwfitparams = get_outputs(hydro_sim, hydro_tdat, hydro_mod)
-	
-	return state, flow, gwlevel, gwstorage
+	year_indices, year_list = get_year_indices(climate_dates)
+
+	return run_hydrology_by_period(year_indices[0]["start"], year_indices[years-1]["end"], init_state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine=engine)
+
+
+
+# run many scenarios at once. rainfall, PET and the extractions are scenarios*days arrays, returns state, flow, gwlevel and gwstorage for every scenario
+# with engine "numpy" the scenarios are simulated together in one pass over time (elements of the returned state have a leading scenario axis), 
+# init_state may be shared or per scenario. The R engine runs the scenarios one after another from a shared init_state
+def run_hydrology_batch(init_state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine="numpy"):
+
+	if engine == "numpy":
+		param = ihacres_gw.read_param()
+		hydro_sim = ihacres_gw.ihacres_gw_batch(param, rainfall, PET, sw_extractions, gw_extractions, *init_state, climate_type=climate_type)
+
+		state = ihacres_gw.get_state(hydro_sim, np.shape(rainfall)[1])
+		flow, gwlevel, gwstorage, gwfitparams = ihacres_gw.get_outputs(hydro_sim, param)
+
+		return state, flow, gwlevel, gwstorage
+	elif engine != "R":
+		raise ValueError("Unknown hydrology engine: %s" % engine)
+
+	days = np.shape(rainfall)[1]
+	runs = [run_hydrology_by_period(0, days, init_state, climate_dates[i], rainfall[i], PET[i], sw_extractions[i], gw_extractions[i], climate_type, engine=engine) for i in range(len(rainfall))]
+	states, flow, gwlevel, gwstorage = zip(*runs)
+
+	return list(states), np.array(flow), np.array(gwlevel), np.array(gwstorage)
+
+# hydrological parameter uncertainty: run an ensemble of sampled parameter sets (see ensemble.py) together in one batched simulation
+# returns flow, gwlevel and gwstorage for each member (members*days), and their percentile bands {"flow": {5: ..., 50: ..., 95: ...}, ...}
+def run_hydrology_ensemble(init_state, rainfall, PET, sw_extractions, gw_extractions, climate_type, members=50, spread=0.1, seed=None, percentiles=(5, 50, 95)):
+
+	param = ensemble.sample_param(ihacres_gw.read_param(), members, spread=spread, seed=seed)
+	flow, gwlevel, gwstorage = ensemble.run_ensemble(param, rainfall, PET, sw_extractions, gw_extractions, *init_state, climate_type=climate_type)
 
+	bands = dict((name, ensemble.summary_bands(x, percentiles)) for name, x in [("flow", flow), ("gwlevel", gwlevel), ("gwstorage", gwstorage)])
 
+	return flow, gwlevel, gwstorage, bands
 
 # from tempfile import NamedTemporaryFile
 # import shutil
@@ -0,0 +1,60 @@
+"""
+Hydrological parameter uncertainty ensembles
+
+Samples IHACRES-GW parameter sets around the calibrated values in data/ and runs all members
+together with ihacres_gw.ihacres_gw_batch, so an ensemble costs about as much as one pass over
+time. Each sampled parameter holds one value per member (members*bores for the gw fits).
+"""
+import copy
+import numpy as np
+
+from hydrological import ihacres_gw
+
+
+# catchment (CMD and unit hydrograph) and aquifer parameters which are sampled
+sw_sampled = ["d", "e", "f", "tauq", "taus"]
+gw_sampled = ["taud"]
+
+# param with the sampled parameters scaled by independent uniform factors in [1 - spread, 1 + spread]
+def sample_param(param, members, spread=0.1, seed=None):
+	random_state = np.random.RandomState(seed)
+	factor = lambda shape: random_state.uniform(1. - spread, 1. + spread, shape)
+
+	sampled = copy.deepcopy(param)
+	for catchment, sw_param in sampled["swParam"].items():
+		for name in sw_sampled:
+			sw_param[name] = sw_param[name]*factor(members)
+		# f is a fraction of d
+		sw_param["f"] = np.minimum(sw_param["f"], 1.)
+
+	for aquifer, gw_param in sampled["gwParam"].items():
+		for name in gw_sampled:
+			if not np.isnan(gw_param[name]):
+				gw_param[name] = gw_param[name]*factor(members)
+
+	# conversion of gw storage to level at each bore
+	for aquifer, fit in sampled["gwFitParam"].items():
+		for name in ["scale", "intercept"]:
+			fit[name] = fit[name]*factor((members, len(fit[name])))
+
+	return sampled
+
+# number of members in a sampled param
+def ensemble_size(param):
+	sizes = [np.size(value) for sw_param in param["swParam"].values() for value in sw_param.values()]
+	return max(sizes)
+
+# run every member of a sampled param on the same climate and extractions, returns flow, gwlevel and gwstorage (members*days)
+def run_ensemble(param, P, T, sw_extraction, gw_extraction, init_gwstorage, init_C, init_Nash, init_Qq, init_Qs, climate_type):
+	members = ensemble_size(param)
+	stack = lambda x: np.tile(np.asarray(x, dtype=float), (members,) + (1,)*np.ndim(x))
+
+	sim = ihacres_gw.ihacres_gw_batch(param, stack(P), stack(T), stack(sw_extraction), stack(gw_extraction),
+		init_gwstorage, init_C, init_Nash, init_Qq, init_Qs, climate_type=climate_type)
+	flow, gwlevel, gwstorage, gwfitparams = ihacres_gw.get_outputs(sim, param)
+
+	return flow, gwlevel, gwstorage
+
+# percentiles of the members at each day {percentile: series}
+def summary_bands(x, percentiles=(5, 50, 95)):
+	return dict((q, np.percentile(x, q, axis=0)) for q in percentiles)
@@ -0,0 +1,51 @@
+import copy
+import unittest
+import numpy as np
+
+from hydrological import ihacres_gw, ensemble
+
+rs = np.random.RandomState(42)
+days = 2*365
+rainfall = rs.gamma(0.3, 10., days)*(rs.rand(days) < 0.3)
+temperature = 18. + 8.*np.sin(2*np.pi*np.arange(days)/365.) + rs.randn(days)
+sw_extractions = np.ones(days)*1406./365
+gw_extractions = np.ones(days)*2200./365
+
+state = (0, 422.7155/2, [0, 0], 0, 0)
+
+
+# the parameters of one member of a sampled param
+def member(param, i):
+    param = copy.deepcopy(param)
+    for group in ["swParam", "gwParam"]:
+        for values in param[group].values():
+            for name, value in values.items():
+                if np.ndim(value):
+                    values[name] = value[i]
+    for fit in param["gwFitParam"].values():
+        fit["scale"], fit["intercept"] = fit["scale"][i], fit["intercept"][i]
+    return param
+
+
+class TestEnsemble(unittest.TestCase):
+
+    def test_members(self):
+        param = ensemble.sample_param(ihacres_gw.read_param(), 4, seed=1)
+        self.assertEqual(ensemble.ensemble_size(param), 4)
+        flow, gwlevel, gwstorage = ensemble.run_ensemble(param, rainfall, temperature, sw_extractions, gw_extractions, *state, climate_type="temperature")
+        self.assertEqual(flow.shape, (4, days))
+
+        for i in range(4):
+            sim = ihacres_gw.ihacres_gw(member(param, i), rainfall, temperature, sw_extractions, gw_extractions, *state, climate_type="temperature")
+            single_flow, single_gwlevel, single_gwstorage, gwfitparams = ihacres_gw.get_outputs(sim, member(param, i))
+            self.assertTrue(np.allclose(single_flow, flow[i]))
+            self.assertTrue(np.allclose(single_gwlevel, gwlevel[i]))
+
+    def test_summary_bands(self):
+        x = rs.rand(20, days)
+        bands = ensemble.summary_bands(x)
+        self.assertTrue(np.all(bands[5] <= bands[50]) and np.all(bands[50] <= bands[95]))
+
+
+if __name__ == '__main__':
+    unittest.main()
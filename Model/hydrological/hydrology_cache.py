@@ -0,0 +1,108 @@
+"""
+Content keyed cache of hydrological model runs
+
+Many scenario parameters (eco weights and thresholds, crop prices, WUE, ...) never reach the
+hydrological model, so sweeps repeat identical runs. A run is keyed by a hash of everything
+it depends on: the climate window, daily extractions, climate type, initial state, engine and
+the contents of the parameter files. Results are kept in memory with least recently used
+eviction, and optionally written to a directory of .npz files shared between processes.
+"""
+import collections
+import hashlib
+import os
+import numpy as np
+
+from ConfigLoader import *
+
+
+# digest of the network and parameter files read by the hydrological model
+def param_files_digest(datadir=None):
+
+	if datadir is None:
+		if "hydrological" in CONFIG.paths:
+			datadir = CONFIG.paths['hydrological'] + "/data/"
+		else:
+			datadir = os.path.dirname(__file__) + "/data/"
+		#end if
+	#end if
+
+	digest = hashlib.sha1()
+	for file_name in sorted(os.listdir(datadir)):
+		if file_name.endswith((".network.csv", ".param.csv")) or file_name == "GwDepthModelZoneConversion.csv":
+			digest.update(file_name.encode())
+			with open(os.path.join(datadir, file_name), 'rb') as f:
+				digest.update(f.read())
+	return digest.hexdigest()
+
+def _update(digest, x):
+	if isinstance(x, (list, tuple)):
+		digest.update(("seq%d" % len(x)).encode())
+		for item in x:
+			_update(digest, item)
+	elif isinstance(x, str):
+		digest.update(("str%d:" % len(x)).encode())
+		digest.update(x.encode())
+	else:
+		# arrays, numbers and R vectors (e.g. the Nash state) are hashed by value
+		x = np.ascontiguousarray(x)
+		digest.update(("%s%s" % (x.dtype.str, x.shape)).encode())
+		digest.update(x.tobytes())
+
+class HydrologyCache():
+
+	def __init__(self, maxsize=128, cache_dir=None, datadir=None):
+		self.maxsize = maxsize
+		self.cache_dir = cache_dir
+		self.param_digest = param_files_digest(datadir)
+		self.results = collections.OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+		if cache_dir is not None and not os.path.isdir(cache_dir):
+			os.makedirs(cache_dir)
+
+	# hash of the inputs of a run, with the parameter files
+	def key(self, *inputs):
+		digest = hashlib.sha1(self.param_digest.encode())
+		_update(digest, list(inputs))
+		return digest.hexdigest()
+
+	# (state, flow, gwlevel, gwstorage) for key, or None. The cached arrays are returned, not copies
+	def get(self, key):
+		if key in self.results:
+			result = self.results.pop(key)
+			self.results[key] = result
+			self.hits += 1
+			return result
+
+		path = self._path(key)
+		if path is not None and os.path.exists(path):
+			with np.load(path) as data:
+				state = (data["gwstorage0"][()], data["C0"][()], data["Nash0"], data["Qq0"][()], data["Qs0"][()])
+				result = (state, data["flow"], data["gwlevel"], data["gwstorage"])
+			self._remember(key, result)
+			self.hits += 1
+			return result
+
+		self.misses += 1
+		return None
+
+	def put(self, key, result):
+		self._remember(key, result)
+
+		path = self._path(key)
+		if path is not None:
+			state, flow, gwlevel, gwstorage = result
+			gwstorage0, C0, Nash0, Qq0, Qs0 = state
+			np.savez(path, gwstorage0=gwstorage0, C0=C0, Nash0=np.array(Nash0, dtype=float), Qq0=Qq0, Qs0=Qs0,
+				flow=flow, gwlevel=gwlevel, gwstorage=gwstorage)
+
+	def _remember(self, key, result):
+		self.results[key] = result
+		while len(self.results) > self.maxsize:
+			self.results.popitem(last=False)
+
+	def _path(self, key):
+		if self.cache_dir is None:
+			return None
+		return os.path.join(self.cache_dir, key + ".npz")
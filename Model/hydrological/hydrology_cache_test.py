@@ -0,0 +1,49 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from hydrological.hydrology_cache import HydrologyCache
+
+rainfall = np.arange(10.)
+state = (0, 422.7155/2, [0, 0], 0, 0)
+
+
+def result(x):
+    return (x, 1., np.array([2., 3.]), 4., 5.), np.ones(10)*x, np.zeros(10), np.arange(10.)
+
+
+class TestHydrologyCache(unittest.TestCase):
+
+    def test_key(self):
+        cache = HydrologyCache()
+        key = cache.key(rainfall, "temperature", list(state))
+        self.assertEqual(key, cache.key(rainfall.copy(), "temperature", list(state)))
+        self.assertNotEqual(key, cache.key(rainfall + 1e-9, "temperature", list(state)))
+        self.assertNotEqual(key, cache.key(rainfall, "PET", list(state)))
+        self.assertNotEqual(key, cache.key(rainfall, "temperature", [1] + list(state[1:])))
+
+    def test_lru(self):
+        cache = HydrologyCache(maxsize=2)
+        cache.put("a", result(1))
+        cache.put("b", result(2))
+        cache.get("a")
+        cache.put("c", result(3))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_disk(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            HydrologyCache(cache_dir=cache_dir).put("a", result(1))
+            state, flow, gwlevel, gwstorage = HydrologyCache(cache_dir=cache_dir).get("a")
+            self.assertEqual(state[0], 1)
+            self.assertTrue(np.array_equal(state[2], [2., 3.]))
+            self.assertTrue(np.array_equal(flow, np.ones(10)))
+        finally:
+            shutil.rmtree(cache_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,669 @@
+"""
+NumPy implementation of Rachel Blakers' IhacresGW hydrological model of Maules Creek
+
+A port of the R code in HydrologicalModel/ which runs without an R runtime.
+Functions are named after the R files they replace, e.g. catchment_moisture_deficit
+is CatchmentMoistureDeficit.R, and return the same series as IhacresGw.R.
+
+The sequential catchment moisture deficit and groundwater recursions are tight
+loops (compiled with numba when it is installed), the linear unit hydrograph,
+Nash cascade and routing stages are evaluated as filters over the whole series.
+"""
+import csv
+import math
+import os
+import numpy as np
+from scipy.signal import lfilter
+
+try:
+	from numba import njit as jit
+except ImportError:
+	# numba is optional, without it the kernels run as plain Python loops
+	def jit(f):
+		return f
+
+from ConfigLoader import *
+
+
+"""
+read parameter files, see Setup/ReadInputData.R
+"""
+
+def _number(x):
+	if x in ("", "NA"):
+		return np.nan
+	return np.float64(x)
+
+def _read_rows(filename):
+	with open(filename) as csvfile:
+		rows = [[x.strip() for x in row] for row in csv.reader(csvfile)]
+	return [row for row in rows if any(row)]
+
+# list of (node, [downstream nodes]) in file order, see ReadNetworkData.R
+def read_network_data(filename):
+	network = []
+	for row in _read_rows(filename):
+		nds = int(_number(row[1]))
+		network.append((row[0], row[2:2+nds]))
+	return network
+
+# node parameters {node: {name: value}} and routing parameters {node: [(downstream node, {name: value})]}, see ReadParamData.R
+def read_param_data(filename, network, node_param_names, route_param_names):
+	rows = _read_rows(filename)
+	header, rows = rows[0], rows[1:]
+
+	node_param = {}
+	route_param = {}
+	for node, downstream in network:
+		routes = []
+		if node_param_names or downstream:
+			col = header.index(node)
+			node_param[node] = dict((name, _number(rows[i][col])) for i, name in enumerate(node_param_names))
+
+			count = len(node_param_names)
+			for ds_node in downstream:
+				if rows[count][col] != ds_node:
+					raise ValueError("The downstream node names in a parameter file and the corresponding network file differ.")
+				routes.append((ds_node, dict((name, _number(rows[count+1+i][col])) for i, name in enumerate(route_param_names))))
+				count += len(route_param_names) + 1
+		route_param[node] = routes
+
+	return node_param, route_param
+
+# {aquifer: {"bores": [...], "scale": array, "intercept": array}}, see ReadGwFitParam.R
+def read_gw_fit_param(path, conversion_path):
+	rows = _read_rows(path)
+	bores = rows[0][1:]
+	fit = dict((row[0], np.array([_number(x) for x in row[1:]])) for row in rows[1:])
+
+	gw_fit_param = {}
+	for row in _read_rows(conversion_path)[1:]:
+		aquifer_bores = [bore for bore in row[1:] if bore not in ("", "NA")]
+		cols = [bores.index(bore) for bore in aquifer_bores]
+		gw_fit_param[row[0]] = {
+			"bores": aquifer_bores,
+			"scale": fit["scale"][cols],
+			"intercept": fit["intercept"][cols],
+		}
+	return gw_fit_param
+
+def read_param(datadir=None):
+
+	if datadir is None:
+		if "hydrological" in CONFIG.paths:
+			datadir = CONFIG.paths['hydrological'] + "/data/"
+		else:
+			datadir = os.path.dirname(__file__) + "/data/"
+		#end if
+	#end if
+
+	path = lambda file_name: os.path.join(datadir, file_name)
+
+	sw_network = read_network_data(path("sw.network.csv"))
+	sw_inflow_network = read_network_data(path("swinflow.network.csv"))
+	gw_network = read_network_data(path("gw.network.csv"))
+	sgw_network = read_network_data(path("sgw.network.csv"))
+	if [node for node, ds in sw_network] != [node for node, ds in sgw_network]:
+		raise ValueError("The order of catchments in the sw.network file and the sgw.network file differ.")
+
+	route_param_names = ["gama", "lambda", "alpha", "phi", "eta", "lag", "tloss"]
+	sw_param, sw_flow_param = read_param_data(path("sw.param.csv"), sw_network,
+		["d", "e", "f", "vd", "vq", "rho", "tauq", "taus", "area", "Qq0", "Qs0"], route_param_names)
+	sw_inflow_param = read_param_data(path("swinflow.param.csv"), sw_inflow_network, [], route_param_names)[1]
+	gw_param, gw_flow_param = read_param_data(path("gw.param.csv"), gw_network,
+		["taud", "sm", "nl", "offset", "scale", "G0", "rp", "taur", "nc"], ["delta", "scalef", "offsetf"])
+	sgw_param = read_param_data(path("sgw.param.csv"), sgw_network, [], ["r", "gs", "rho_na"])[1]
+
+	gw_fit_param = read_gw_fit_param(path("gwfit.param.csv"), path("GwDepthModelZoneConversion.csv"))
+
+	return {
+		"swNetwork": sw_network,
+		"gwNetwork": gw_network,
+		"sgwNetwork": sgw_network,
+		"swInflowNetwork": sw_inflow_network,
+		"swParam": sw_param,
+		"gwParam": gw_param,
+		"sgwParam": sgw_param,
+		"swFlowParam": sw_flow_param,
+		"swInflowParam": sw_inflow_param,
+		"gwFlowParam": gw_flow_param,
+		"gwFitParam": gw_fit_param,
+	}
+
+
+"""
+model components, see HydrologicalModel/
+"""
+
+@jit
+def _cmd_kernel(P, T, d, e, f, init_C, temperature):
+	s = P.shape[0]
+	U = np.zeros(s)
+	C = np.zeros(s)
+	E = np.empty(s)
+	E[:] = np.nan
+
+	g = f*d
+	C_prev = init_C
+	for k in range(s):
+		# calculate CMD in the absence of evapotranspiration, exponential form of the drainage equation
+		if P[k] > 0:
+			if C_prev >= d:
+				Cf = C_prev - P[k]
+				if Cf < d:
+					Cf = d*math.exp((Cf - d)/d)
+			else:
+				Cf = C_prev*math.exp(-P[k]/d)
+		else:
+			Cf = C_prev
+
+		if temperature:
+			if T[k] <= 0:
+				E[k] = 0.
+				C[k] = Cf
+			else:
+				if Cf > g:
+					E[k] = e*T[k]*math.exp((1 - Cf/g)*2)
+				else:
+					E[k] = e*T[k]
+				C[k] = Cf + E[k]
+		else:
+			# NOTE T will actually be PET
+			if Cf > g:
+				C[k] = Cf + T[k]*math.exp((1 - Cf/g)*2)
+			else:
+				C[k] = Cf
+
+		if P[k] > 0:
+			if C_prev > Cf:
+				U[k] = P[k] - (C_prev - Cf)
+			else:
+				raise ValueError("C-prev < Cf")
+		else:
+			U[k] = 0.
+
+		C_prev = C[k]
+		# correct errors due to machine precision
+		if U[k] < 0:
+			U[k] = 0.
+
+	return U, C, E
+
+# effective rainfall U, catchment moisture deficit C and evapotranspiration E
+def catchment_moisture_deficit(P, T, sw_param, init_C, climate_type='temperature'):
+	f, e, d = sw_param["f"], sw_param["e"], sw_param["d"]
+	assert f >= 0 and e >= 0 and d >= 0
+
+	P = np.ascontiguousarray(P, dtype=float)
+	T = np.ascontiguousarray(T, dtype=float)
+	return _cmd_kernel(P, T, float(d), float(e), float(f), float(init_C), climate_type == 'temperature')
+
+# _cmd_kernel for a batch of series P, T (scenarios * days), one time step at a time across all scenarios
+# d, e, f and init_C may be scalars or one value per scenario
+def _cmd_batch(P, T, d, e, f, init_C, temperature):
+	U = np.zeros(P.shape)
+	C = np.zeros(P.shape)
+	E = np.empty(P.shape)
+	E[:] = np.nan
+
+	g = f*d
+	C_prev = np.zeros(P.shape[0]) + init_C
+	for k in range(P.shape[1]):
+		Pk = P[:, k]
+		Tk = T[:, k]
+		wet = Pk > 0
+		# calculate CMD in the absence of evapotranspiration, exponential form of the drainage equation
+		Cf = np.where(C_prev >= d, C_prev - Pk, C_prev*np.exp(-Pk/d))
+		Cf = np.where((C_prev >= d) & (Cf < d), d*np.exp((Cf - d)/d), Cf)
+		Cf = np.where(wet, Cf, C_prev)
+
+		if temperature:
+			Ek = np.where(Cf > g, e*Tk*np.exp((1 - Cf/g)*2), e*Tk)
+			E[:, k] = np.where(Tk <= 0, 0., Ek)
+			C[:, k] = Cf + E[:, k]
+		else:
+			# NOTE T will actually be PET
+			C[:, k] = np.where(Cf > g, Cf + Tk*np.exp((1 - Cf/g)*2), Cf)
+
+		if np.any(wet & (C_prev <= Cf)):
+			raise ValueError("C-prev < Cf")
+		# correct errors due to machine precision
+		U[:, k] = np.maximum(np.where(wet, Pk - (C_prev - Cf), 0.), 0.)
+		C_prev = C[:, k]
+
+	return U, C, E
+
+# effective rainfall partitioned to quickflow Uq and slowflow Us
+def flow_partitioning(sw_param, U):
+	vq = sw_param["vq"]
+	vs = 1 - vq
+	assert np.all((vs >= 0) & (vs <= 1))
+	assert np.all((vq >= 0) & (vq <= 1))
+
+	return U*vq, U*vs
+
+# response of a linear store, Q[k] = -alpha*Q[k-1] + (1 + alpha)*U[k], along the last axis
+# taux may be one time constant per row of U
+def unit_hydrograph(U, taux, init_Q):
+	assert np.all(np.asarray(taux) >= 0)
+
+	U = np.asarray(U, dtype=float)
+	if np.ndim(taux):
+		init_Q = np.zeros(U.shape[:-1]) + init_Q
+		return np.array([unit_hydrograph(U[i], taux[i], init_Q[i]) for i in range(len(U))])
+
+	alpha = -np.exp(-1./taux)
+	zi = -alpha*np.asarray(init_Q, dtype=float)[..., None]*np.ones(U.shape[:-1] + (1,))
+	Q, zf = lfilter([1. + alpha], [1., alpha], U, axis=-1, zi=zi)
+	return Q
+
+# m linear stores in series, returns the outflow and the state of every store at each time step
+def nash_cascade(U, tauf, m, init_Q):
+	assert np.all(np.asarray(tauf) >= 0)
+
+	Q = np.asarray(U, dtype=float)
+	Q_prev = np.empty(Q.shape + (m,))
+	for j in range(m):
+		Q = unit_hydrograph(Q, tauf, np.asarray(init_Q, dtype=float)[..., j])
+		Q_prev[..., j] = Q
+	return Q, Q_prev
+
+# route a complete upstream series to the downstream node, along the last axis
+# tloss is applied before the routed flow is fed back, as for the upstream inflows in IhacresGw.R
+def route(param, Q, tloss=0.):
+	lag = int(param["lag"])
+	alpha = param["alpha"]
+	gama = param["gama"]
+	omega = param["phi"]
+
+	# upstream inflow is a lagged, weighted average of the last two days
+	h = np.zeros(lag + 2)
+	h[lag] = gama*(1 - omega)
+	h[lag + 1] = gama*omega
+	return lfilter((1 - tloss)*(1 - alpha)*h, [1., -(1 - tloss)*alpha], np.asarray(Q, dtype=float), axis=-1)
+
+# discharge to the stream and flow to the downstream aquifer at time step k, updates G, Gf and Qd in place
+@jit
+def gw_variable_flow(G, Gf, Qd, a, Gs, catchment, aquifer, ds_aquifer, b, Gds0, k):
+	a = a[aquifer]
+	if ds_aquifer >= 0:
+		Gds_star = G[k, ds_aquifer]
+
+		if Gds_star >= Gds0:
+			Gup_star = G[k, aquifer] + (b/(1 + b))*Gds_star
+			if ((1 + b)/(1 + 2*b))*Gup_star >= Gs:
+				# gw storage in upstream aquifer and discharge to stream
+				G[k, aquifer] = ((1 + b)/(1 + 2*b + a + a*b))*Gup_star
+				Qd[k, catchment] = Qd[k, catchment] + a*G[k, aquifer]
+			else:
+				G[k, aquifer] = ((1 + b)/(1 + 2*b))*Gup_star
+			# gw storage volume in downstream aquifer and flow between aquifers
+			G[k, ds_aquifer] = (1./(1 + b))*(Gds_star + b*G[k, aquifer])
+			Gf[k] = b*(G[k, aquifer] - G[k, ds_aquifer])
+		else:
+			Gup_star = G[k, aquifer] + b*Gds0
+			if (1./(1 + b))*Gup_star >= Gs:
+				G[k, aquifer] = (1./(1 + b + a))*Gup_star
+				Qd[k, catchment] = Qd[k, catchment] + a*G[k, aquifer]
+			else:
+				G[k, aquifer] = (1./(1 + b))*Gup_star
+			Gf[k] = b*(G[k, aquifer] - Gds0)
+			G[k, ds_aquifer] = Gds_star + Gf[k]
+	else:
+		# there is no flow between aquifers, calculate discharge to the stream only
+		if G[k, aquifer] >= Gs:
+			G[k, aquifer] = (1./(1 + a))*G[k, aquifer]
+			Qd[k, catchment] = Qd[k, catchment] + a*G[k, aquifer]
+
+@jit
+def _gw_kernel(G, S, Gf, Qd, Q, swE, Qqs, Qr, sw_extraction, init_G, a,
+	pair_catchment, pair_aquifer, pair_ds, pair_gs, pair_b, pair_gds0,
+	route_dest, route_src, route_lag, route_alpha, route_gama, route_phi):
+
+	s, m = G.shape
+	n = Q.shape[1]
+	for k in range(s):
+		# add groundwater storage volume from previous time step to each aquifer
+		if k == 0:
+			for j in range(m):
+				G[k, j] = G[k, j] + init_G[j]
+		else:
+			for j in range(m):
+				G[k, j] = G[k, j] + G[k - 1, j]
+				S[k, j] = S[k, j] + S[k - 1, j]
+
+		for i in range(n):
+			# route flow from upstream catchments, upstream inflows are routed before the time loop
+			for r in range(route_dest.shape[0]):
+				if route_dest[r] == i and route_src[r] >= 0:
+					lag = route_lag[r]
+					omega = route_phi[r]
+					if k < lag:
+						upstream = 0.
+					elif k == lag:
+						upstream = route_gama[r]*(1 - omega)*Q[k - lag, route_src[r]]
+					else:
+						upstream = route_gama[r]*((1 - omega)*Q[k - lag, route_src[r]] + omega*Q[k - lag - 1, route_src[r]])
+					if k == 0:
+						Qr[k, r] = (1 - route_alpha[r])*upstream
+					else:
+						Qr[k, r] = route_alpha[r]*Qr[k - 1, r] + (1 - route_alpha[r])*upstream
+
+			# groundwater recharge discharge
+			for p in range(pair_catchment.shape[0]):
+				if pair_catchment[p] == i:
+					gw_variable_flow(G, Gf, Qd, a, pair_gs[p], i, pair_aquifer[p], pair_ds[p], pair_b[p], pair_gds0[p], k)
+					for j in range(m):
+						S[k, j] = S[k, j] - Qd[k, j % n]
+
+			# total flow, the sum of runoff, groundwater discharge and upstream inflow, after extractions
+			routed = 0.
+			for r in range(route_dest.shape[0]):
+				if route_dest[r] == i:
+					routed += Qr[k, r]
+			qe = (Qqs[k, i] + Qd[k, i] + routed) - sw_extraction[k, i]
+			Q[k, i] = max(0., qe)
+			# extractions greater than the available surface water supply
+			swE[k, i] = min(0., qe)
+
+# gw_variable_flow for a batch of scenarios, G is scenarios*s*m, Gf scenarios*s and Qd scenarios*s*n
+def _gw_variable_flow_batch(G, Gf, Qd, a, Gs, catchment, aquifer, ds_aquifer, b, Gds0, k):
+	a = a[..., aquifer]
+	Gk = G[:, k, aquifer]
+	if ds_aquifer >= 0:
+		Gds_star = G[:, k, ds_aquifer]
+		above = Gds_star >= Gds0
+
+		Gup_star = np.where(above, Gk + (b/(1 + b))*Gds_star, Gk + b*Gds0)
+		discharge = np.where(above, ((1 + b)/(1 + 2*b))*Gup_star >= Gs, (1./(1 + b))*Gup_star >= Gs)
+		Gk = np.where(above,
+			np.where(discharge, ((1 + b)/(1 + 2*b + a + a*b))*Gup_star, ((1 + b)/(1 + 2*b))*Gup_star),
+			np.where(discharge, (1./(1 + b + a))*Gup_star, (1./(1 + b))*Gup_star))
+		Qd[:, k, catchment] = np.where(discharge, Qd[:, k, catchment] + a*Gk, Qd[:, k, catchment])
+
+		Gds = (1./(1 + b))*(Gds_star + b*Gk)
+		Gf[:, k] = np.where(above, b*(Gk - Gds), b*(Gk - Gds0))
+		G[:, k, ds_aquifer] = np.where(above, Gds, Gds_star + Gf[:, k])
+		G[:, k, aquifer] = Gk
+	else:
+		# there is no flow between aquifers, calculate discharge to the stream only
+		discharge = Gk >= Gs
+		G[:, k, aquifer] = np.where(discharge, (1./(1 + a))*Gk, Gk)
+		Qd[:, k, catchment] = np.where(discharge, Qd[:, k, catchment] + a*G[:, k, aquifer], Qd[:, k, catchment])
+
+# _gw_kernel for a batch of scenarios, every array has a leading scenario axis. Each time step is evaluated for all scenarios at once
+def _gw_batch(G, S, Gf, Qd, Q, swE, Qqs, Qr, sw_extraction, init_G, a,
+	pair_catchment, pair_aquifer, pair_ds, pair_gs, pair_b, pair_gds0,
+	route_dest, route_src, route_lag, route_alpha, route_gama, route_phi):
+
+	s, m = G.shape[1:]
+	n = Q.shape[2]
+	for k in range(s):
+		# add groundwater storage volume from previous time step to each aquifer
+		if k == 0:
+			G[:, k] = G[:, k] + init_G
+		else:
+			G[:, k] = G[:, k] + G[:, k - 1]
+			S[:, k] = S[:, k] + S[:, k - 1]
+
+		for i in range(n):
+			# route flow from upstream catchments, upstream inflows are routed before the time loop
+			for r in range(route_dest.shape[0]):
+				if route_dest[r] == i and route_src[r] >= 0:
+					lag = route_lag[r]
+					omega = route_phi[r]
+					if k < lag:
+						upstream = 0.
+					elif k == lag:
+						upstream = route_gama[r]*(1 - omega)*Q[:, k - lag, route_src[r]]
+					else:
+						upstream = route_gama[r]*((1 - omega)*Q[:, k - lag, route_src[r]] + omega*Q[:, k - lag - 1, route_src[r]])
+					if k == 0:
+						Qr[:, k, r] = (1 - route_alpha[r])*upstream
+					else:
+						Qr[:, k, r] = route_alpha[r]*Qr[:, k - 1, r] + (1 - route_alpha[r])*upstream
+
+			# groundwater recharge discharge
+			for p in range(pair_catchment.shape[0]):
+				if pair_catchment[p] == i:
+					_gw_variable_flow_batch(G, Gf, Qd, a, pair_gs[p], i, pair_aquifer[p], pair_ds[p], pair_b[p], pair_gds0[p], k)
+					for j in range(m):
+						S[:, k, j] = S[:, k, j] - Qd[:, k, j % n]
+
+			# total flow, the sum of runoff, groundwater discharge and upstream inflow, after extractions
+			qe = (Qqs[:, k, i] + Qd[:, k, i] + Qr[:, k, route_dest == i].sum(axis=-1)) - sw_extraction[:, k, i]
+			Q[:, k, i] = np.maximum(0., qe)
+			# extractions greater than the available surface water supply
+			swE[:, k, i] = np.minimum(0., qe)
+
+# groundwater level at each bore {aquifer: s*bores array}
+def calculate_gw_heads(G, gw_fit_param, aquifers):
+	Glevel = {}
+	for j, aquifer in enumerate(aquifers):
+		if aquifer in gw_fit_param:
+			fit = gw_fit_param[aquifer]
+			# fits given per member (members*bores) apply along the time axis
+			scale, intercept = [np.asarray(x)[..., None, :] if np.ndim(x) > 1 else x for x in (fit["scale"], fit["intercept"])]
+			Glevel[aquifer] = G[..., j, None]*scale + intercept
+	return Glevel
+
+# parameters given per member (one value per scenario of a batch) broadcast along the time axis
+def _per_member(x):
+	x = np.asarray(x, dtype=float)
+	return x[..., None] if x.ndim else x
+
+# shape x as a (scenarios*)s*ncol array
+def _columns(x, shape):
+	if x is None:
+		return np.zeros(shape)
+	x = np.asarray(x, dtype=float)
+	if x.ndim == len(shape) - 1:
+		# a single series is the first catchment or aquifer, the rest are zero
+		columns = np.zeros(shape)
+		columns[..., 0] = x
+		return columns
+	return x
+
+
+"""
+IhacresGw.R
+"""
+
+# outputs is a list of names to return only those (see select_outputs), or None for every series of IhacresGw.R
+def ihacres_gw(param, P, T, sw_extraction, gw_extraction, init_gwstorage, init_C, init_Nash, init_Qq, init_Qs, climate_type, sw_inflow=None, outputs=None):
+	return _ihacres_gw(param, P, T, sw_extraction, gw_extraction, init_gwstorage, init_C, init_Nash, init_Qq, init_Qs, climate_type, sw_inflow, (), outputs)
+
+# ihacres_gw for a batch of scenarios run together in one pass over time
+# P, T and the extractions are scenarios*days (the first catchment or aquifer) or scenarios*days*nodes, the initial state 
+# may be shared or given per scenario. Every output has a leading scenario axis
+def ihacres_gw_batch(param, P, T, sw_extraction, gw_extraction, init_gwstorage, init_C, init_Nash, init_Qq, init_Qs, climate_type, sw_inflow=None, outputs=None):
+	return _ihacres_gw(param, P, T, sw_extraction, gw_extraction, init_gwstorage, init_C, init_Nash, init_Qq, init_Qs, climate_type, sw_inflow, (len(P),), outputs)
+
+def _ihacres_gw(param, P, T, sw_extraction, gw_extraction, init_gwstorage, init_C, init_Nash, init_Qq, init_Qs, climate_type, sw_inflow, batch, outputs):
+
+	catchments = [node for node, ds in param["swNetwork"]]
+	aquifers = [node for node, ds in param["gwNetwork"]]
+	n = len(catchments)
+	m = len(aquifers)
+	s = np.shape(P)[len(batch)]
+
+	P = _columns(P, batch + (s, n))
+	T = _columns(T, batch + (s, n))
+	sw_extraction = _columns(sw_extraction, batch + (s, n))
+	gw_extraction = _columns(gw_extraction, batch + (s, m))
+
+	sw_param = param["swParam"]
+	gw_param = param["gwParam"]
+
+	U = np.zeros(batch + (s, n))
+	Uq, Us, Ud, C, raw_C, E, Qq, Qs = [np.zeros(batch + (s, n)) for i in range(8)]
+
+	for i, catchment in enumerate(catchments):
+		area = _per_member(sw_param[catchment]["area"])
+		vd = _per_member(sw_param[catchment]["vd"])
+		# proportion of rainfall infiltrating to gw (converted from depth to volume: 1mm*1km^2 = 1ML)
+		Ud[..., i] = vd*P[..., i]*area
+		# proportion of rainfall contributing to runoff
+		Presid = (1 - vd)*P[..., i]
+		if batch:
+			cmd_U, cmd_C, cmd_E = _cmd_batch(Presid, T[..., i], sw_param[catchment]["d"], sw_param[catchment]["e"], sw_param[catchment]["f"], init_C, climate_type == 'temperature')
+		else:
+			cmd_U, cmd_C, cmd_E = catchment_moisture_deficit(Presid, T[..., i], sw_param[catchment], init_C, climate_type=climate_type)
+		raw_C[..., i] = cmd_C
+		C[..., i] = cmd_C*area
+		U[..., i] = cmd_U*area
+		E[..., i] = cmd_E*area
+
+		Uq[..., i], Us[..., i] = flow_partitioning(sw_param[catchment], U[..., i])
+
+		# quickflow and shallow subsurface flow
+		Qq[..., i] = unit_hydrograph(Uq[..., i], sw_param[catchment]["tauq"], init_Qq)
+		Qs[..., i] = unit_hydrograph(Us[..., i], sw_param[catchment]["taus"], init_Qs)
+
+	# losses to gw recharge from streamflow
+	Qqs = Qq + Qs
+	Qrech = np.array([sw_param[catchment]["rho"] for catchment in catchments])*Qqs
+	Qqs = Qqs - Qrech
+
+	# net recharge from rainfall, groundwater extractions and natural losses
+	R = np.zeros(batch + (s, m))
+	pump = np.zeros(batch + (s, m))
+	for j, aquifer in enumerate(aquifers):
+		R[..., j] = R[..., j] - gw_extraction[..., j] - gw_param[aquifer]["nl"]
+		if not np.all(np.isnan(gw_param[aquifer]["taud"])):
+			pump[..., j] = gw_extraction[..., j]*gw_param[aquifer]["sm"]
+
+	# add diffuse and streamflow recharge to gw recharge
+	next_Nash = 0.
+	Rdiffuse = None
+	for i, catchment in enumerate(catchments):
+		sgw_param = dict(param["sgwParam"][catchment])
+		for j, aquifer in enumerate(aquifers):
+			if aquifer in sgw_param:
+				recharge_frac = sgw_param[aquifer]["r"]
+				Rstream = recharge_frac*Qrech[..., i]
+				if np.isnan(gw_param[aquifer]["nc"]):
+					Rdiffuse = recharge_frac*Ud[..., i]
+					next_Nash = 0.
+				else:
+					Rdiffuse, next_Nash = nash_cascade(recharge_frac*Ud[..., i], gw_param[aquifer]["taur"], int(gw_param[aquifer]["nc"]), init_Nash)
+				R[..., j] = R[..., j] + Rstream + Rdiffuse
+
+	# groundwater discharge fraction for each aquifer
+	taud = np.stack(np.broadcast_arrays(*[gw_param[aquifer]["taud"] for aquifer in aquifers]), axis=-1)
+	alpha_s = -np.exp(-1./taud)
+	a = -(1 + alpha_s)/alpha_s
+
+	# surface - groundwater connections in the order discharge occurs
+	gw_network = dict(param["gwNetwork"])
+	pairs = []
+	for i, catchment in enumerate(catchments):
+		for aquifer, sgw_param in param["sgwParam"][catchment]:
+			if gw_network[aquifer]:
+				# NOTE as in GwVariableFlow.R, assumes there is only 1 downstream aquifer
+				ds_aquifer = gw_network[aquifer][0]
+				flow_param = dict(param["gwFlowParam"][aquifer])[ds_aquifer]
+				pairs.append((i, aquifers.index(aquifer), aquifers.index(ds_aquifer), sgw_param["gs"], flow_param["delta"], flow_param["offsetf"]))
+			else:
+				pairs.append((i, aquifers.index(aquifer), -1, sgw_param["gs"], 0., 0.))
+
+	# routed flow from upstream catchments and upstream inflows, per catchment in the column order of IhacresGw.R
+	routes = []
+	Qr_names = dict((catchment, []) for catchment in catchments)
+	for i, catchment in enumerate(catchments):
+		for us_name, downstream in param["swNetwork"]:
+			if catchment in downstream:
+				routes.append((i, catchments.index(us_name), dict(param["swFlowParam"][us_name])[catchment], None))
+				Qr_names[catchment].append(us_name)
+		for p, (us_name, downstream) in enumerate(param["swInflowNetwork"]):
+			if catchment in downstream:
+				routes.append((i, -1, dict(param["swInflowParam"][us_name])[catchment], us_name))
+				Qr_names[catchment].append(us_name)
+
+	Qr = np.zeros(batch + (s, len(routes)))
+	for r, (i, src, flow_param, inflow_name) in enumerate(routes):
+		if src < 0:
+			# upstream inflows are known, route the whole series and apply transmission losses
+			inflow_col = [name for name, ds in param["swInflowNetwork"]].index(inflow_name)
+			Qr[..., r] = route(flow_param, _columns(sw_inflow, batch + (s, len(param["swInflowNetwork"])))[..., inflow_col], flow_param["tloss"])
+
+	G = R.copy()
+	S = R - pump
+	Gf = np.zeros(batch + (s,))
+	Qd = np.zeros(batch + (s, n))
+	Q = np.zeros(batch + (s, n))
+	swE = np.zeros(batch + (s, n))
+	gw_kernel = _gw_batch if batch else _gw_kernel
+	gw_kernel(G, S, Gf, Qd, Q, swE, Qqs, Qr, sw_extraction, np.zeros(batch + (m,)) + np.asarray(init_gwstorage, dtype=float)[..., None], a,
+		np.array([p[0] for p in pairs], dtype=np.int64),
+		np.array([p[1] for p in pairs], dtype=np.int64),
+		np.array([p[2] for p in pairs], dtype=np.int64),
+		np.array([p[3] for p in pairs], dtype=float),
+		np.array([p[4] for p in pairs], dtype=float),
+		np.array([p[5] for p in pairs], dtype=float),
+		np.array([r[0] for r in routes], dtype=np.int64),
+		np.array([r[1] for r in routes], dtype=np.int64),
+		np.array([0 if r[1] < 0 else int(r[2]["lag"]) for r in routes], dtype=np.int64),
+		np.array([r[2]["alpha"] for r in routes], dtype=float),
+		np.array([r[2]["gama"] for r in routes], dtype=float),
+		np.array([r[2]["phi"] for r in routes], dtype=float))
+
+	# levels at every bore are only needed when asked for
+	Glevel = None
+	if outputs is None or "Glevel" in outputs:
+		Glevel = calculate_gw_heads(G, param["gwFitParam"], aquifers)
+
+	# routed flow per catchment, a column of zeros where there is no upstream flow
+	route_dest = np.array([r[0] for r in routes], dtype=np.int64)
+	Qr = dict((catchment, Qr[..., route_dest == i] if Qr_names[catchment] else np.zeros(batch + (s, 1))) for i, catchment in enumerate(catchments))
+
+	sim = {"U": U, "C": C, "E": E, "Q": Q, "Qq": Qq, "Qs": Qs, "Qr": Qr, "raw_C": raw_C, "next_Nash": next_Nash,
+		"Qd": Qd, "G": G, "Uq": Uq, "Us": Us, "Ud": Ud, "R": R, "Gf": Gf, "swE": swE, "Rdiffuse": Rdiffuse,
+		"S": S, "Glevel": Glevel}
+	if outputs is None:
+		return sim
+	return select_outputs(sim, param, outputs)
+
+
+"""
+equivalents of run_hydrology, get_state and get_outputs in RunIhacresGw.py
+"""
+
+# get state so model can be stopped and started
+# for a batch, each element of the state has a leading scenario axis
+def get_state(sim, state_index):
+	return sim["G"][..., state_index-1, 0], sim["raw_C"][..., state_index-1, 0], sim["next_Nash"][..., state_index-1, :], sim["Qq"][..., state_index-1, 0], sim["Qs"][..., state_index-1, 0]
+
+# the outputs of a run named in outputs, as views of the model series rather than copies. As for SelectIhacresOutputs in WrappableRunIhacresGw.R:
+# "flow", "gwstorage" ~ flow and gw storage of the first catchment and aquifer
+# "gwlevel" ~ gw level at bore gw_i of aquifer
+# "state" ~ model state at the last time step, to continue the run from
+# any other name is a series of sim
+def select_outputs(sim, param, outputs, aquifer="gw_shallow", gw_i=3):
+	selected = {}
+	for name in outputs:
+		if name == "flow":
+			selected[name] = sim["Q"][..., 0]
+		elif name == "gwstorage":
+			selected[name] = sim["G"][..., 0]
+		elif name == "gwlevel":
+			j = [node for node, ds in param["gwNetwork"]].index(aquifer)
+			fit = param["gwFitParam"][aquifer]
+			scale, intercept = [np.asarray(x)[..., gw_i, None] if np.ndim(x) > 1 else x[gw_i] for x in (fit["scale"], fit["intercept"])]
+			selected[name] = sim["G"][..., j]*scale + intercept
+		elif name == "state":
+			selected[name] = get_state(sim, sim["G"].shape[-2])
+		else:
+			selected[name] = sim[name]
+	return selected
+
+# extract data from hydrological model output, scenarios*days for a batch
+def get_outputs(sim, param):
+	gw_i = 3
+	# "GW030130_1" "GW030131_1" "GW030132_2" "GW036186_1" "GW036187_1"
+	gwlevel = sim["Glevel"]["gw_shallow"][..., gw_i] # 3rd col varies most
+	flow = sim["Q"][..., 0]
+	gwstorage = sim["G"][..., 0]
+	gwfitparams = -np.array([param["gwFitParam"]["gw_shallow"]["scale"][..., gw_i], param["gwFitParam"]["gw_shallow"]["intercept"][..., gw_i]])
+
+	return flow, gwlevel, gwstorage, gwfitparams
@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+
+from hydrological import ihacres_gw
+
+rs = np.random.RandomState(42)
+days = 3*365
+rainfall = rs.gamma(0.3, 10., days)*(rs.rand(days) < 0.3)
+temperature = 18. + 8.*np.sin(2*np.pi*np.arange(days)/365.) + rs.randn(days)
+sw_extractions = np.ones(days)*1406./365
+gw_extractions = np.ones(days)*2200./365
+
+state = (0, 422.7155/2, [0, 0], 0, 0)
+
+
+class TestIhacresGw(unittest.TestCase):
+
+    def setUp(self):
+        self.param = ihacres_gw.read_param()
+
+    def test_unit_hydrograph(self):
+        alpha = -np.exp(-1./2.5)
+        Q = np.empty(days)
+        Q_prev = 3.
+        for k in range(days):
+            Q[k] = -alpha*Q_prev + (1 + alpha)*rainfall[k]
+            Q_prev = Q[k]
+        self.assertTrue(np.allclose(ihacres_gw.unit_hydrograph(rainfall, 2.5, 3.), Q))
+
+    def test_nash_cascade(self):
+        Q, Q_prev = ihacres_gw.nash_cascade(rainfall, 5., 2, [1., 2.])
+        first = ihacres_gw.unit_hydrograph(rainfall, 5., 1.)
+        self.assertTrue(np.allclose(Q_prev[:, 0], first))
+        self.assertTrue(np.allclose(Q, ihacres_gw.unit_hydrograph(first, 5., 2.)))
+
+    def test_route(self):
+        param = {"lag": 2, "alpha": 0.3, "gama": 0.8, "phi": 0.4}
+        Qr = np.empty(days)
+        for k in range(days):
+            if k < 2:
+                upstream = 0.
+            elif k == 2:
+                upstream = 0.8*0.6*rainfall[k - 2]
+            else:
+                upstream = 0.8*(0.6*rainfall[k - 2] + 0.4*rainfall[k - 3])
+            Qr[k] = (1 - 0.3)*upstream if k == 0 else 0.3*Qr[k - 1] + (1 - 0.3)*upstream
+        self.assertTrue(np.allclose(ihacres_gw.route(param, rainfall), Qr))
+
+    def test_restart_from_state(self):
+        whole = ihacres_gw.ihacres_gw(self.param, rainfall, temperature, sw_extractions, gw_extractions, *state, climate_type="temperature")
+
+        first = ihacres_gw.ihacres_gw(self.param, rainfall[:365], temperature[:365], sw_extractions[:365], gw_extractions[:365], *state, climate_type="temperature")
+        next_state = ihacres_gw.get_state(first, 365)
+        rest = ihacres_gw.ihacres_gw(self.param, rainfall[365:], temperature[365:], sw_extractions[365:], gw_extractions[365:], *next_state, climate_type="temperature")
+
+        self.assertTrue(np.allclose(whole["Q"][365:], rest["Q"]))
+        self.assertTrue(np.allclose(whole["G"][365:, 0], rest["G"][:, 0]))
+
+    def test_batch(self):
+        scale = np.array([0.5, 1., 1.5])
+        batch = ihacres_gw.ihacres_gw_batch(self.param, rainfall*scale[:, None], np.tile(temperature, (3, 1)), np.outer(scale, sw_extractions), np.outer(scale, gw_extractions), *state, climate_type="temperature")
+        flow, gwlevel, gwstorage, gwfitparams = ihacres_gw.get_outputs(batch, self.param)
+        self.assertEqual(flow.shape, (3, days))
+
+        for i in range(3):
+            sim = ihacres_gw.ihacres_gw(self.param, rainfall*scale[i], temperature, sw_extractions*scale[i], gw_extractions*scale[i], *state, climate_type="temperature")
+            self.assertTrue(np.allclose(sim["Q"][:, 0], flow[i]))
+            self.assertTrue(np.allclose(sim["G"][:, 0], gwstorage[i]))
+
+    def test_outputs(self):
+        sim = ihacres_gw.ihacres_gw(self.param, rainfall, temperature, sw_extractions, gw_extractions, *state, climate_type="temperature")
+        flow, gwlevel, gwstorage, gwfitparams = ihacres_gw.get_outputs(sim, self.param)
+        self.assertEqual(flow.shape, (days,))
+        self.assertTrue(np.all(flow >= 0))
+        self.assertTrue(np.allclose(gwlevel, -gwfitparams[0]*gwstorage - gwfitparams[1]))
+
+
+    def test_select_outputs(self):
+        sim = ihacres_gw.ihacres_gw(self.param, rainfall, temperature, sw_extractions, gw_extractions, *state, climate_type="temperature")
+        selected = ihacres_gw.ihacres_gw(self.param, rainfall, temperature, sw_extractions, gw_extractions, *state, climate_type="temperature", outputs=["state", "flow", "gwlevel", "Qd"])
+        self.assertEqual(sorted(selected), ["Qd", "flow", "gwlevel", "state"])
+
+        flow, gwlevel, gwstorage, gwfitparams = ihacres_gw.get_outputs(sim, self.param)
+        self.assertTrue(np.array_equal(selected["flow"], flow))
+        self.assertTrue(np.array_equal(selected["gwlevel"], gwlevel))
+        self.assertTrue(np.array_equal(selected["Qd"], sim["Qd"]))
+        for x, y in zip(selected["state"], ihacres_gw.get_state(sim, days)):
+            self.assertTrue(np.array_equal(x, y))
+
+
+if __name__ == '__main__':
+    unittest.main()
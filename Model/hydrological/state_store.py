@@ -0,0 +1,54 @@
+"""
+Store of warmed up hydrological model states
+
+run_integrated discards the first years of every run as model burn in. Scenarios which share a
+climate window and the extractions during the burn in reach the same state at the end of it,
+so the state is simulated once, kept here, and later runs start from it.
+States are keyed by the start of the climate window and a hash of the burn in inputs, and can be
+saved to a json file to be reused by later sessions.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+
+from hydrological.RunIhacresGw import run_hydrology_by_period
+
+
+class StateStore():
+
+	def __init__(self, path=None):
+		self.path = path
+		self.states = {}
+		if path is not None and os.path.exists(path):
+			with open(path) as f:
+				self.states = json.load(f)
+
+	# key of the state after simulating climate_dates[:end]
+	def key(self, init_state, end, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine):
+		digest = hashlib.sha1()
+		for x in [rainfall[:end], PET[:end], sw_extractions[:end], gw_extractions[:end]]:
+			digest.update(np.ascontiguousarray(np.asarray(x, dtype=float)).tobytes())
+		digest.update(json.dumps([_plain(init_state), climate_type, engine]).encode())
+		return "%s_%s_%s" % (climate_dates[0], climate_dates[end-1], digest.hexdigest())
+
+	# model state at the end of the burn in period climate_dates[:end], simulated only if it isn't stored
+	def warm_state(self, init_state, end, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine="R"):
+		key = self.key(init_state, end, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine)
+		if key not in self.states:
+			state, flow, gwlevel, gwstorage = run_hydrology_by_period(0, end, init_state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine=engine)
+			self.put(key, state)
+
+		gwstorage, C, Nash, Qq, Qs = self.states[key]
+		return gwstorage, C, list(Nash), Qq, Qs
+
+	def put(self, key, state):
+		self.states[key] = _plain(state)
+		if self.path is not None:
+			with open(self.path, 'w') as f:
+				json.dump(self.states, f)
+
+# state as json friendly floats and lists, the Nash cascade state may be an array or R vector
+def _plain(state):
+	gwstorage, C, Nash, Qq, Qs = state
+	return [float(gwstorage), float(C), [float(x) for x in Nash], float(Qq), float(Qs)]
@@ -0,0 +1,46 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from hydrological import ihacres_gw
+from hydrological.RunIhacresGw import run_hydrology_by_period
+from hydrological.state_store import StateStore
+
+rs = np.random.RandomState(42)
+days = 3*365
+climate_dates = np.array([(datetime.date(2000, 1, 1) + datetime.timedelta(i)).strftime("%Y-%m-%d") for i in range(days)])
+rainfall = rs.gamma(0.3, 10., days)*(rs.rand(days) < 0.3)
+temperature = 18. + 8.*np.sin(2*np.pi*np.arange(days)/365.) + rs.randn(days)
+sw_extractions = np.ones(days)*1406./365
+gw_extractions = np.ones(days)*2200./365
+
+state = (0, 422.7155/2, [0, 0], 0, 0)
+
+
+class TestStateStore(unittest.TestCase):
+
+    def test_warm_state(self):
+        store_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(store_dir, "states.json")
+            warm = StateStore(path).warm_state(state, 730, climate_dates, rainfall, temperature, sw_extractions, gw_extractions, "temperature", engine="numpy")
+
+            # the second store reads the state back from the file
+            store = StateStore(path)
+            self.assertEqual(len(store.states), 1)
+            self.assertEqual(store.warm_state(state, 730, climate_dates, rainfall, temperature, sw_extractions, gw_extractions, "temperature", engine="numpy"), warm)
+            self.assertNotEqual(store.key(state, 730, climate_dates, rainfall, temperature, sw_extractions*2, gw_extractions, "temperature", "numpy"), list(store.states)[0])
+
+            # starting from the stored state is the same as running through the burn in
+            whole = ihacres_gw.ihacres_gw(ihacres_gw.read_param(), rainfall, temperature, sw_extractions, gw_extractions, *state, climate_type="temperature")
+            rest = run_hydrology_by_period(730, days, warm, climate_dates, rainfall, temperature, sw_extractions, gw_extractions, "temperature", engine="numpy")
+            self.assertTrue(np.allclose(whole["Q"][730:, 0], rest[1]))
+        finally:
+            shutil.rmtree(store_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
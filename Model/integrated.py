@@ -5,9 +5,9 @@ import matplotlib.pyplot as plt
 
 from climate.read_climate import read_climate_projections, read_original_data, read_all_bom_data, find_extremes, read_NSW_data
 
-from hydrological.RunIhacresGw import dateifier, get_year_indices, generate_extractions, run_hydrology_by_year, f_by_year
+from hydrological.RunIhacresGw import dateifier, get_year_indices, generate_extractions, run_hydrology_by_year, run_hydrology_by_period, f_by_year
 
-from farm_decision.farm_optimize import load_chosen_crops, maximum_profit, list_all_combos
+from farm_decision.farm_optimize import load_chosen_crops, load_chosen_crop_table, maximum_profit, list_all_combos
 
 from ecological.ecological_indices import calculate_water_index, eco_weights_parameters, eco_ctf_parameters, eco_min_separation_parameters, eco_min_duration_parameters
 
@@ -114,11 +114,11 @@ def run_integrated(years, WUE, water_limit, AWD, adoption, crop_price_choice,
 				   climate_dates, rainfall, PET, climate_type,
 				   eco_min_separation, eco_min_duration, eco_ctf, eco_weights, plot,
 				   	timing_col, duration_col, dry_col, gwlevel_col,
-				   	sw_uncertainty, gw_uncertainty, crop_trend, cj_options):
+				   	sw_uncertainty, gw_uncertainty, crop_trend, cj_options, hydro_engine="R", single_shot_hydrology=False, burn_in_states=None):
 
 	# TODO add prices as parameter once we have min, max
 	# crop prices, yields, costs all determined here
-	crops = load_chosen_crops(WUE, crop_price_choice ) #load chosen crops.csv data, then manipulate water use (ML/ha) based on WUE scenarios (e.g. min flood wue is 50%)
+	crops = load_chosen_crop_table(WUE, crop_price_choice ) #load chosen crops.csv data, then manipulate water use (ML/ha) based on WUE scenarios (e.g. min flood wue is 50%)
 
 	#adoption['flood'] = % area under flood irrigation (0~100). Used in optimisation, farm_area = max farm area (km^2) under flood and spray irrigation.
 	farm_area = {
@@ -141,6 +141,16 @@ def run_integrated(years, WUE, water_limit, AWD, adoption, crop_price_choice,
 	all_years_gwlevel = np.empty((year_indices[years-1]["end"]))
 	all_years_profit = np.empty((year_indices[years-1]["end"]))
 
+	# the first burn_in_years are discarded before the ecological model
+	burn_in_years = 2
+
+	# with single_shot_hydrology the extractions for every year are collected first, then the hydrological model is run once over all years
+	# with burn_in_states (a hydrological.state_store.StateStore) the model state at the end of the burn in is looked up, and only simulated if it isn't stored
+	# (same dtype as generate_extractions so the daily values are identical to the year by year runs)
+	if single_shot_hydrology or burn_in_states is not None:
+		all_years_sw_extractions = np.empty_like(climate_dates[:year_indices[years-1]["end"]])
+		all_years_gw_extractions = np.empty_like(climate_dates[:year_indices[years-1]["end"]])
+
 	# hydrological timeseries model initial state
 	state = (0, #initial gw storage
 				422.7155/2, # d/2 #initial C
@@ -161,13 +171,7 @@ def run_integrated(years, WUE, water_limit, AWD, adoption, crop_price_choice,
 	for year in range(years):
 
 		# adjust crop prices so they stay the same, trend up, or trend down
-		for i in range(len(crops)):
-			if crop_trend == "flat":
-				crops[i]['price ($/unit)'] = crops[i]['price med ($/unit)'] 
-			elif crop_trend == "down":
-				crops[i]['price ($/unit)'] = crops[i]['price med ($/unit)'] - 0.2 * crops[i]['price med ($/unit)'] * (year+1.0) / years 			
-			elif crop_trend == "up":
-				crops[i]['price ($/unit)'] = crops[i]['price med ($/unit)'] + 0.2 * crops[i]['price med ($/unit)'] * (year+1.0) / years 
+		crops = crops.with_prices(crops.trended_prices(crop_trend, year, years))
 
 		AWD_surface = AWD_policy(previous_rainfall, AWD['sw unregulated'])
 		sw_deficit = max(0., AWD['sw unregulated'] - AWD_surface) * water_limit['sw unregulated']
@@ -236,14 +240,21 @@ def run_integrated(years, WUE, water_limit, AWD, adoption, crop_price_choice,
 
 		sw_extractions, gw_extractions = generate_extractions(climate_dates, AWD_surface*water_limit['sw unregulated']/365, AWD_gw*water_limit['gw']/365)
 
-		farm_profit = maximum_profit(crops, farm_area, {'surface': AWD_surface * water_limit['sw unregulated'], 'ground': AWD_gw * water_limit['gw']})
+		farm_profit = maximum_profit(crops, farm_area, {'surface': AWD_surface * water_limit['sw unregulated'], 'ground': AWD_gw * water_limit['gw']}, solver="basis")
 
-		state, flow, gwlevel, gwstorage = run_hydrology_by_year(year, state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type)
-		
 		indices = year_indices[year]
-		all_years_gwstorage[indices["start"]:indices["end"]] = gwstorage #no use
-		all_years_gwlevel[indices["start"]:indices["end"]] = gwlevel*gw_uncertainty
-		all_years_flow[indices["start"]:indices["end"]] = flow*sw_uncertainty
+		if single_shot_hydrology or (burn_in_states is not None and year < burn_in_years):
+			all_years_sw_extractions[indices["start"]:indices["end"]] = sw_extractions[indices["start"]:indices["end"]]
+			all_years_gw_extractions[indices["start"]:indices["end"]] = gw_extractions[indices["start"]:indices["end"]]
+		else:
+			if burn_in_states is not None and year == burn_in_years:
+				state = burn_in_states.warm_state(state, indices["start"], climate_dates, rainfall, PET, all_years_sw_extractions, all_years_gw_extractions, climate_type, engine=hydro_engine)
+
+			state, flow, gwlevel, gwstorage = run_hydrology_by_year(year, state, climate_dates, rainfall, PET, sw_extractions, gw_extractions, climate_type, engine=hydro_engine)
+		
+			all_years_gwstorage[indices["start"]:indices["end"]] = gwstorage #no use
+			all_years_gwlevel[indices["start"]:indices["end"]] = gwlevel*gw_uncertainty
+			all_years_flow[indices["start"]:indices["end"]] = flow*sw_uncertainty
 		all_years_profit[indices["start"]:indices["end"]] = farm_profit #annual value repeated for each day
 
 		# previous_rainfall = np.sum(rainfall[indices["start"]:indices["end"]])
@@ -252,13 +263,25 @@ def run_integrated(years, WUE, water_limit, AWD, adoption, crop_price_choice,
 
 		annual_profit.append(farm_profit)
 
+	if single_shot_hydrology:
+		start = 0
+		if burn_in_states is not None:
+			start = year_indices[burn_in_years]["start"]
+			state = burn_in_states.warm_state(state, start, climate_dates, rainfall, PET, all_years_sw_extractions, all_years_gw_extractions, climate_type, engine=hydro_engine)
+
+		state, flow, gwlevel, gwstorage = run_hydrology_by_period(start, year_indices[years-1]["end"], state, climate_dates, rainfall, PET, all_years_sw_extractions, all_years_gw_extractions, climate_type, engine=hydro_engine)
+
+		all_years_gwstorage[start:] = gwstorage #no use
+		all_years_gwlevel[start:] = gwlevel*gw_uncertainty
+		all_years_flow[start:] = flow*sw_uncertainty
+
 	# dispose of burn in dates
 	# start with the third year. ie burn in period different for the climate periods, which start at different date of a year.
-	the_dates = climate_dates[year_indices[2]["start"]:year_indices[years-1]["end"]]
-	all_years_flow = all_years_flow[year_indices[2]["start"]:]
-	all_years_gwlevel = all_years_gwlevel[year_indices[2]["start"]:]
-	all_years_profit = all_years_profit[year_indices[2]["start"]:]
-	rainfall = rainfall[year_indices[2]["start"]:year_indices[years-1]["end"]]
+	the_dates = climate_dates[year_indices[burn_in_years]["start"]:year_indices[years-1]["end"]]
+	all_years_flow = all_years_flow[year_indices[burn_in_years]["start"]:]
+	all_years_gwlevel = all_years_gwlevel[year_indices[burn_in_years]["start"]:]
+	all_years_profit = all_years_profit[year_indices[burn_in_years]["start"]:]
+	rainfall = rainfall[year_indices[burn_in_years]["start"]:year_indices[years-1]["end"]]
 
 
 	# run ecological model 
@@ -20,6 +20,11 @@ from ecological.ecological_indices import calculate_water_index, eco_weights_par
 
 from integrated import run_integrated
 
+from hydrological.RunIhacresGw import set_hydrology_cache
+from hydrological.hydrology_cache import HydrologyCache
+from farm_decision.farm_optimize import set_profit_cache
+from farm_decision.profit_cache import ProfitCache
+
 from ConfigLoader import *
 
 def main():
@@ -222,6 +227,16 @@ def run_scenarios():
 	# print "COMBOS", len(all_combos2), 
 	# print "Estimated time (h)", len(all_combos2)*6/60/60
 
+	# combos which differ only in eco, crop price or farm parameters share hydrological runs
+	set_hydrology_cache(HydrologyCache())
+	# and, with flat prices, the same farm LP year after year
+	set_profit_cache(ProfitCache())
+
+	# the climate record and its extreme windows are the same for every combo
+	all_climate_dates, all_rainfall, all_PET = read_all_bom_data()
+	window = 366*12
+	min_i, med_i, max_i = find_extremes(all_rainfall, window) #3 climate scenarios
+
 	# for combo in all_combos2:
 	for combo in default_combos:
 	# for combo in cj_combos:
@@ -252,10 +267,7 @@ def run_scenarios():
 		# SCENARIO/PARAMETER - climate
 		# [min_i, med_i, max_i]
 		climate_type = "temperature" 
-		climate_dates, rainfall, PET = read_all_bom_data()
-		window = 366*12
 		years = 12 # 2 years burn in
-		min_i, med_i, max_i = find_extremes(rainfall, window) #3 climate scenarios
 		climate_scenarios = {"dry": min_i, "avg": med_i, "wet": max_i}
 
 		WUE_scenarios = {
@@ -318,7 +330,7 @@ def run_scenarios():
 		# SCENARIO/PARAMETER - climate
 		# ["min", "med", "max"]
 		per_i = climate_scenarios[climate_choice]
-		climate_dates, rainfall, PET = climate_dates[per_i:per_i+window], rainfall[per_i:per_i+window], PET[per_i:per_i+window]
+		climate_dates, rainfall, PET = all_climate_dates[per_i:per_i+window], all_rainfall[per_i:per_i+window], all_PET[per_i:per_i+window]
 
 		# climate_type = "PET"
 		# climate_dates, rainfall, PET = read_climate_projections('climate/419051.csv', scenario=1)